@@ -0,0 +1,212 @@
+import csv
+import io
+import json
+import threading
+import time
+from array import array
+
+BUCKET_SECONDS = 0.25  # response-time histogram resolution
+BUCKETS = 240          # 0-60s; slower answers land in the last bucket
+CHUNK_ROWS = 2000      # rows per chunk handed to the response
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+class QuestionStats:
+    """Running totals for one question across every game that asked it"""
+
+    __slots__ = ('options', 'rounds', 'answered', 'correct', 'correct_index', 'times')
+
+    def __init__(self, option_count, correct_index):
+        self.options = array('Q', bytes(8 * option_count))
+        self.rounds = 0
+        self.answered = 0
+        self.correct = 0
+        self.correct_index = correct_index
+        self.times = array('I', bytes(4 * BUCKETS))  # answers per BUCKET_SECONDS of response time
+
+    def time_percentile(self, q):
+        """Upper edge of the histogram bucket holding the q-th response, in seconds"""
+        total = sum(self.times)
+        if not total:
+            return None
+        rank, seen = q * total, 0
+        for bucket, count in enumerate(self.times):
+            seen += count
+            if seen > rank:
+                return (bucket + 1) * BUCKET_SECONDS
+
+
+class AnswerStats:
+    """Audience results of every finished round, kept in process for export.
+
+    Rounds are appended to parallel typed arrays (about 60 bytes a round, option counts in one flat array
+    indexed by `_offsets`), and folded into one QuestionStats per (bank, question id). Export generators
+    read rows up to the length they started at and yield them in chunks, so a long export neither holds
+    the lock nor builds the whole file in memory.
+    """
+
+    ROUND_FIELDS = ('round', 'game', 'game_code', 'ended_at', 'bank', 'question_id', 'correct_index', 'answered',
+                    'correct', 'correct_rate', 'p50_seconds', 'p90_seconds', 'option_counts')
+    QUESTION_FIELDS = ('bank', 'question_id', 'question', 'rounds', 'answered', 'correct', 'correct_rate',
+                       'correct_index', 'p50_seconds', 'p90_seconds', 'option_counts')
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self._ended_at = array('d')
+        self._game = array('I')
+        self._bank = array('H')
+        self._question_id = array('I')
+        self._correct_index = array('b')
+        self._answered = array('I')
+        self._correct = array('I')
+        self._p50_ms = array('I')
+        self._p90_ms = array('I')
+        self._offsets = array('Q', [0])  # round i's counts are _option_counts[_offsets[i]:_offsets[i + 1]]
+        self._option_counts = array('I')
+        self._banks = []        # bank names, indexed by _bank
+        self._bank_index = {}
+        self._game_codes = []   # code of each game, indexed by _game
+        self._game_index = {}   # host token -> index into _game_codes
+        self._game_rounds = []  # rows recorded for each game
+        self._questions = {}    # (bank, question id) -> QuestionStats
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def record(self, game_code, game):
+        """Append the round `game` has just finished"""
+        question = game.current_question
+        audience = [pid for pid in game.answers if game.players.get(pid) and game.players[pid].role == 'audience']
+        seconds = sorted(game.answer_seconds[pid] for pid in audience if pid in game.answer_seconds)
+        self.add(game_code, game.host_token, game.bank, question.id, question.correct_answer_index,
+                 game.answer_counts, len(game.correct_answers), seconds)
+
+    def add(self, game_code, game_key, bank, question_id, correct_index, option_counts, correct, seconds):
+        """Append one round; `seconds` are the audience's response times, sorted"""
+        answered = sum(option_counts)
+        with self._lock:
+            game = self._game_index.get(game_key)
+            if game is None:
+                game = self._game_index[game_key] = len(self._game_codes)
+                self._game_codes.append(game_code)
+                self._game_rounds.append(array('I'))
+            bank_index = self._bank_index.get(bank)
+            if bank_index is None:
+                bank_index = self._bank_index[bank] = len(self._banks)
+                self._banks.append(bank)
+            self._ended_at.append(self.clock())
+            self._game.append(game)
+            self._bank.append(bank_index)
+            self._question_id.append(question_id)
+            self._correct_index.append(correct_index)
+            self._answered.append(answered)
+            self._correct.append(correct)
+            self._p50_ms.append(self._ms(percentile(seconds, 0.5)))
+            self._p90_ms.append(self._ms(percentile(seconds, 0.9)))
+            self._option_counts.extend(option_counts)
+            # Readers don't lock: a round counts once its offset is in, so that goes last
+            self._offsets.append(len(self._option_counts))
+            self._game_rounds[game].append(len(self._offsets) - 2)
+
+            stats = self._questions.get((bank, question_id))
+            if stats is None or len(stats.options) != len(option_counts):
+                stats = self._questions[bank, question_id] = QuestionStats(len(option_counts), correct_index)
+            stats.rounds += 1
+            stats.answered += answered
+            stats.correct += correct
+            stats.correct_index = correct_index
+            for option, count in enumerate(option_counts):
+                stats.options[option] += count
+            for s in seconds:
+                stats.times[min(BUCKETS - 1, int(s / BUCKET_SECONDS))] += 1
+
+    @staticmethod
+    def _ms(seconds):
+        # 0 stands for "no answers"; a real answer is at least 1 ms
+        return 0 if seconds is None else max(1, round(seconds * 1000))
+
+    def has_game(self, game_key):
+        return game_key in self._game_index
+
+    def rounds(self, game_key=None):
+        """Round rows as dicts, oldest first; only one game's when `game_key` (its host token) is given"""
+        if game_key is None:
+            rows = range(len(self))
+        else:
+            game = self._game_index.get(game_key)
+            rows = self._game_rounds[game][:] if game is not None else ()
+        for i in rows:
+            answered, correct = self._answered[i], self._correct[i]
+            p50, p90 = self._p50_ms[i], self._p90_ms[i]
+            yield {
+                'round': i + 1,
+                'game': self._game[i] + 1,
+                'game_code': self._game_codes[self._game[i]],
+                'ended_at': round(self._ended_at[i], 3),
+                'bank': self._banks[self._bank[i]],
+                'question_id': self._question_id[i],
+                'correct_index': self._correct_index[i],
+                'answered': answered,
+                'correct': correct,
+                'correct_rate': round(correct / answered, 4) if answered else None,
+                'p50_seconds': p50 / 1000 if p50 else None,
+                'p90_seconds': p90 / 1000 if p90 else None,
+                'option_counts': self._option_counts[self._offsets[i]:self._offsets[i + 1]].tolist(),
+            }
+
+    def questions(self, describe=lambda bank, question_id: None):
+        """One row per question asked, worst correct rate first; `describe` supplies the question text"""
+        with self._lock:
+            items = list(self._questions.items())
+        items.sort(key=lambda item: (item[1].correct / item[1].answered if item[1].answered else 1, item[0]))
+        for (bank, question_id), stats in items:
+            yield {
+                'bank': bank,
+                'question_id': question_id,
+                'question': describe(bank, question_id),
+                'rounds': stats.rounds,
+                'answered': stats.answered,
+                'correct': stats.correct,
+                'correct_rate': round(stats.correct / stats.answered, 4) if stats.answered else None,
+                'correct_index': stats.correct_index,
+                'p50_seconds': stats.time_percentile(0.5),
+                'p90_seconds': stats.time_percentile(0.9),
+                'option_counts': stats.options.tolist(),
+            }
+
+
+def ndjson(rows):
+    """Rows as newline-delimited JSON, CHUNK_ROWS lines per chunk"""
+    chunk = []
+    for row in rows:
+        chunk.append(json.dumps(row, separators=(',', ':')))
+        if len(chunk) == CHUNK_ROWS:
+            yield '\n'.join(chunk) + '\n'
+            chunk = []
+    if chunk:
+        yield '\n'.join(chunk) + '\n'
+
+
+def csv_lines(rows, fields):
+    """Rows as CSV with a header, CHUNK_ROWS lines per chunk; option_counts are joined with ';'"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    count = 0
+    for row in rows:
+        row['option_counts'] = ';'.join(map(str, row['option_counts']))
+        writer.writerow([row[field] for field in fields])
+        count += 1
+        if count == CHUNK_ROWS:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            count = 0
+    if buffer.tell():
+        yield buffer.getvalue()
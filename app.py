@@ -1,247 +1,544 @@
+import functools
 import random
-import string
 import os
-from flask import Flask, render_template, request, session, redirect, url_for
+from flask import Flask, Response, render_template, request
+# HTTP routes read http_request: asgi.py points `request` at its socket stand-in, which only has .sid
+from flask import request as http_request
 from flask_socketio import SocketIO, emit, join_room, leave_room
 import secrets
 import time
-import json
+import logging
+from game_store import create_game_store
+from game_journal import GameJournal
+from game_codes import CodeAllocator, CodeExhausted
+from scheduler import Scheduler
+from models import Game, Player
+from placement import CirclePlacer
+from chat import ChatRoom
+from sweeper import ExpiryHeap, rss_bytes
+from metrics import Metrics, setup_queue_logging
+from question_bank import QuestionBank, QuestionBankRegistry
+from static_assets import StaticAssets, PageCache
+from answer_stats import AnswerStats, ndjson, csv_lines
+
+log = logging.getLogger('gameshow')
+metrics = Metrics()
+
+class MeteredSocketIO(SocketIO):
+    """Times every registered handler and counts every emit, including flask_socketio.emit() from handlers"""
+
+    def __init__(self, *args, **kwargs):
+        self.event_handlers = {}  # event -> timed handler, reused by the ASGI entry point in asgi.py
+        super().__init__(*args, **kwargs)
+
+    def on(self, message, namespace=None):
+        register = super().on(message, namespace)
+        def decorator(handler):
+            timed = self.event_handlers[message] = metrics.timed(message, handler)
+            register(timed)
+            return handler
+        return decorator
+
+    def emit(self, event, *args, **kwargs):
+        metrics.emitted(event)
+        return super().emit(event, *args, **kwargs)
+
+# SOCKETIO_SERIALIZER=msgpack sends binary MessagePack frames (needs the msgpack package) and packs players and
+# leaderboard rows as arrays; pages load the socket.io client bundle that carries the matching parser
+SOCKETIO_SERIALIZER = os.environ.get('SOCKETIO_SERIALIZER') or 'default'
+SOCKETIO_CLIENT = {
+    'default': 'https://cdn.socket.io/4.8.1/socket.io.min.js',
+    'msgpack': 'https://cdn.socket.io/4.8.1/socket.io.msgpack.min.js',
+}[SOCKETIO_SERIALIZER]
+Player.compact = SOCKETIO_SERIALIZER == 'msgpack'
 
 app = Flask(__name__)
-socketio = SocketIO(app, cors_allowed_origins="*", manage_session=True)
+# Set SOCKETIO_MESSAGE_QUEUE (e.g. redis://localhost:6379/0) to fan emits out across worker processes
+socketio = MeteredSocketIO(app, cors_allowed_origins="*", manage_session=True,
+                    serializer=metrics.packet_class(SOCKETIO_SERIALIZER),
+                    message_queue=os.environ.get('SOCKETIO_MESSAGE_QUEUE'))
 app.config['SECRET_KEY'] = os.environ.get('FLASK_SECRET_KEY')
 app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
 app.config['SESSION_COOKIE_HTTPONLY'] = True
 
-try:
-    with open('questions.json', 'r') as f:
-        QUESTIONS = json.load(f)
-except (IOError, json.JSONDecodeError) as e:
-    QUESTIONS = []
+# static/ is hashed and gzip/brotli-compressed once here; url_for('static', ...) links to the hashed names
+# STATIC_CACHE=0 serves static/ and templates straight from disk, so edits show up without a restart
+static_assets = StaticAssets(app.static_folder)
+pages = PageCache(render_template)
+static_assets.enabled = pages.enabled = os.environ.get('STATIC_CACHE', '1') != '0'
+
+def static_file(filename):
+    response = static_assets.send(filename) if static_assets.enabled else None
+    return response or app.send_static_file(filename)
+app.view_functions['static'] = static_file
+
+@app.context_processor
+def socketio_client():
+    return {'socketio_client': SOCKETIO_CLIENT}
+
+@app.url_defaults
+def fingerprint_static(endpoint, values):
+    if endpoint == 'static' and 'filename' in values:
+        values['filename'] = static_assets.fingerprinted(values['filename'])
+
+# Banks live in QUESTION_BANK_DIR/<name>.json; questions.json stays available as the 'default' bank
+QUESTION_BANKS = QuestionBankRegistry(os.environ.get('QUESTION_BANK_DIR', 'question_banks'), default_path='questions.json')
 
 BAD_WORDS = {'ExampleForNow9291'}
 AVATAR_COLORS = [
     '#FF6B6B', '#4ECDC4', '#45B7D1', '#FED766', '#F0B3A8',
     '#8A84E2', '#3D405B', '#F2CC8F', '#81B29A', '#E07A5F'
 ]
-games = {}
-
-def generate_game_code():
+# TIME_SCALE < 1 compresses every round and grace timer (used by benchmarks/loadtest.py)
+TIME_SCALE = float(os.environ.get('TIME_SCALE', 1))
+ANSWER_SECONDS = 30 * TIME_SCALE
+VOTE_SECONDS = 15 * TIME_SCALE
+RESULTS_SECONDS = 10 * TIME_SCALE
+DISCONNECT_GRACE_SECONDS = 30 * TIME_SCALE
+SCHEDULER_TICK = 0.05
+JOURNAL_FLUSH_SECONDS = 0.5
+CHAT_BATCH_SECONDS = 0.1
+LIVE_TALLY_SECONDS = 0.25
+SWEEP_SECONDS = 1.0
+# Idle time before a game is dropped, by state; override with e.g. GAME_TTL_LOBBY=600
+GAME_TTLS = {
+    state: float(os.environ.get(f'GAME_TTL_{state.upper()}', seconds)) for state, seconds in {
+        'lobby': 2 * 3600, 'redirecting': 600, 'answering': 3600, 'voting': 3600,
+        'results': 3600, 'intermission': 3600, 'game_over': 300,
+    }.items()
+}
+DISCONNECTED_PLAYER_TTL = float(os.environ.get('DISCONNECTED_PLAYER_TTL', 1800))
+
+games = create_game_store(os.environ.get('GAME_STORE_URL'))
+# Codes are GAME_CODE_LENGTH characters of A-Z0-9: 4 gives 1.68M, 3 gives 46,656
+game_codes = CodeAllocator(int(os.environ.get('GAME_CODE_LENGTH') or 4))
+sid_index = {}     # sid -> (game_code, role), local to the worker holding the connection
+scheduler = Scheduler()
+phase_timers = {}  # game_code -> scheduler handle for the next phase transition
+_scheduler_task = None
+# Set GAME_JOURNAL_DIR to log game events to disk and rebuild games from it after a restart
+journal = GameJournal(os.environ['GAME_JOURNAL_DIR']) if os.environ.get('GAME_JOURNAL_DIR') else None
+_journal_flush = None
+chat_rooms = {}    # game_code -> ChatRoom, local to the worker
+chat_flushes = {}  # game_code -> scheduler handle for the pending chat batch
+tally_flushes = {}  # game_code -> scheduler handle for the pending live_tally to the host
+answer_stats = AnswerStats()  # every finished round's audience results on this worker, for /export
+# /export covers every game on the worker, so it needs `Authorization: Bearer <EXPORT_TOKEN>`; unset, it is off
+EXPORT_TOKEN = os.environ.get('EXPORT_TOKEN')
+# ('game', code) idle expiry, ('disconnect', code, sid) and ('host', code) grace periods,
+# ('player', code, player id) for players who left; drained by sweep_expired()
+expiries = ExpiryHeap()
+
+metrics.gauge('games', 'Games in the store', lambda: len(games))
+metrics.gauge('players', 'Players across all games', lambda: sum(len(g.players) for g in games.values()))
+metrics.gauge('local_connections', 'Sids indexed on this worker', lambda: len(sid_index))
+metrics.gauge('scheduled_tasks', 'Callbacks waiting in the shared scheduler', lambda: len(scheduler))
+metrics.gauge('pending_disconnects', 'Disconnects inside their grace period', lambda: expiries.count('disconnect'))
+metrics.gauge('expiry_entries', 'Keys waiting in the expiry heap', lambda: len(expiries))
+metrics.gauge('rss_bytes', 'Resident memory of this worker', lambda: rss_bytes() or 0)
+
+def run_scheduler():
     while True:
-        code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=3))
-        if code not in games:
-            return code
+        delay = scheduler.run_due()
+        socketio.sleep(SCHEDULER_TICK if delay is None else min(delay, SCHEDULER_TICK))
+
+def start_scheduler():
+    global _scheduler_task
+    if _scheduler_task is None:
+        _scheduler_task = socketio.start_background_task(run_scheduler)
+        scheduler.call_later(SWEEP_SECONDS, sweep_expired)
+
+def schedule(delay, fn, *args):
+    start_scheduler()
+    return scheduler.call_later(delay, fn, *args)
+
+def save_game(game_code, game):
+    """Save and push the game's idle expiry out by the TTL for its current state"""
+    start_scheduler()
+    game.last_active = time.time()
+    games.save(game_code, game)
+    expiries.expire_at(('game', game_code), idle_deadline(game))
+
+def idle_deadline(game):
+    return game.last_active + GAME_TTLS.get(game.state, GAME_TTLS['lobby'])
+
+def sweep_expired():
+    """The one periodic sweep: run grace-period endings and drop idle games and stale disconnect records"""
+    scheduler.call_later(SWEEP_SECONDS, sweep_expired)
+    expired = expiries.pop_expired(time.time())
+    if not expired: return
+
+    rss_before = rss_bytes()
+    removed = 0
+    for key in expired:
+        kind, game_code = key[0], key[1]
+        if kind == 'disconnect':
+            finish_disconnect(game_code, key[2])
+        elif kind == 'host':
+            close_if_host_gone(game_code)
+        elif kind == 'player':
+            drop_disconnected_player(game_code, key[2])
+        elif kind == 'game' and expire_idle_game(game_code):
+            removed += 1
+    if removed:
+        log.info("sweep games_removed=%d games=%d rss_before=%s rss_after=%s",
+                 removed, len(games), rss_before, rss_bytes())
+
+def locks_game(game_code_of=lambda game_code, *_: game_code):
+    """Run the function holding the lock of the game `game_code_of(*args)` names (by default its first argument)"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args):
+            with games.lock(game_code_of(*args)):
+                return fn(*args)
+        return wrapper
+    return decorator
+
+def sid_game_code(*_):
+    return get_game_code_for_sid(request.sid)
+
+def log_event(game_code, game, kind, *keys):
+    """Journal the current value of each Game attribute; a tuple key is an attribute then dict keys, e.g. ('answers', pid)"""
+    if not journal: return
+    changes = {}
+    for key in keys:
+        path = key if isinstance(key, tuple) else (key,)
+        value = getattr(game, path[0])
+        for part in path[1:]:
+            value = value[part]
+        changes[key] = value
+    journal.append(game_code, kind, changes)
+    schedule_journal_flush()
+
+def schedule_journal_flush():
+    global _journal_flush
+    if _journal_flush is None:
+        _journal_flush = schedule(JOURNAL_FLUSH_SECONDS, flush_journal)
+
+def flush_journal():
+    global _journal_flush
+    _journal_flush = None
+    for game_code in journal.flush():
+        snapshot_game(game_code)
+
+@locks_game()
+def snapshot_game(game_code):
+    game = games.get(game_code)
+    if game:
+        journal.snapshot(game_code, game)
+
+def recover_games():
+    """Reload journaled games, resume their round timers and give every old connection the usual grace period"""
+    started = time.time()
+    count = 0
+    for game_code, game in journal.recover():
+        if game_code in games: continue
+        game_codes.reserve(game_code)
+        game.reindex()
+        taken = {p.position for p in game.players.values() if p.position}
+        game.placer.exclude(taken)
+        save_game(game_code, game)
+        count += 1
+        if game.state in ['answering', 'voting', 'results'] and game.phase_deadline:
+            phase_timers[game_code] = schedule(max(0, game.phase_deadline - time.time()),
+                                               advance_phase, game_code, game.phase_id)
+        for sid in [game.host_sid, *game.by_sid]:
+            if sid:
+                expiries.expire_at(('disconnect', game_code, sid), time.time() + DISCONNECT_GRACE_SECONDS)
+        for player in game.players.values():
+            if player.sid is None:
+                expiries.expire_at(('player', game_code, player.id), player.disconnect_time + DISCONNECTED_PLAYER_TTL)
+    if count:
+        log.info("games_recovered count=%d seconds=%.3f", count, time.time() - started)
 
 def get_game_code_for_sid(sid):
-    for code, game_data in games.items():
-        if sid in game_data['players'] or sid == game_data.get('host_sid'):
-            return code
+    entry = sid_index.get(sid)
+    if entry and entry[0] in games:
+        return entry[0]
     return None
 
-def generate_circle_position(existing_positions):
-    """Generate a non-overlapping position for a player circle"""
-    max_attempts = 50
-    for _ in range(max_attempts):
-        top = random.uniform(10, 75)
-        left = random.uniform(5, 90)
-        
-        overlaps = False
-        for pos in existing_positions:
-            distance = ((top - pos['top'])**2 + (left - pos['left'])**2)**0.5
-            if distance < 15:
-                overlaps = True
-                break
-        
-        if not overlaps:
-            return {'top': top, 'left': left}
-    
-    return {'top': random.uniform(10, 75), 'left': random.uniform(5, 90)}
-
-def initialize_game_state(game):
-    game['state'] = 'lobby'
-    game['round'] = 0
-    game['round_number'] = 1
-    game['questions_used'] = []
-    game['current_question'] = None
-    game['current_contestants'] = {}
-    game['current_audience'] = {}
-    game['player_scores'] = {sid: 0 for sid in game['players']}
-    game['current_answers'] = {}
-    game['current_votes'] = {} 
-    game['timer_task'] = None
-    game['player_positions'] = {}
-    game['contestants_this_round'] = []
-    game['disconnected_players'] = {}  # Track temporarily disconnected players
-
-def update_contestant_audience_sids(game, old_sid, new_sid):
-    """Update contestant/audience dicts when a player's SID changes"""
-    if old_sid in game['current_contestants']:
-        game['current_contestants'][new_sid] = game['current_contestants'].pop(old_sid)
-        game['current_contestants'][new_sid]['sid'] = new_sid
-    
-    if old_sid in game['current_audience']:
-        game['current_audience'][new_sid] = game['current_audience'].pop(old_sid)
-        game['current_audience'][new_sid]['sid'] = new_sid
-    
-    if old_sid in game['current_answers']:
-        game['current_answers'][new_sid] = game['current_answers'].pop(old_sid)
-    
-    if old_sid in game['current_votes']:
-        game['current_votes'][new_sid] = game['current_votes'].pop(old_sid)
-    
-    if old_sid in game.get('contestants_this_round', []):
-        idx = game['contestants_this_round'].index(old_sid)
-        game['contestants_this_round'][idx] = new_sid
+def index_sid(sid, game_code, role):
+    sid_index[sid] = (game_code, role)
+
+def set_host_sid(game_code, game, sid):
+    old_sid = game.host_sid
+    if old_sid and old_sid != sid and sid_index.get(old_sid, (None,))[0] == game_code:
+        sid_index.pop(old_sid, None)
+    game.host_sid = sid
+    index_sid(sid, game_code, 'host')
+
+@locks_game()
+def remove_game(game_code):
+    game = games.pop(game_code, None)
+    if game:
+        game_codes.release(game_code)
+    expiries.discard(('game', game_code))
+    expiries.discard(('host', game_code))
+    scheduler.cancel(phase_timers.pop(game_code, None))
+    scheduler.cancel(chat_flushes.pop(game_code, None))
+    scheduler.cancel(tally_flushes.pop(game_code, None))
+    chat_rooms.pop(game_code, None)
+    if journal:
+        journal.drop(game_code)
+    if not game: return
+    for sid in [game.host_sid, *game.by_sid]:
+        if sid_index.get(sid, (None,))[0] == game_code:
+            sid_index.pop(sid, None)
+
+def describe_question(bank, question_id):
+    questions = QUESTION_BANKS.get(bank)
+    question = questions.get(question_id) if questions else None
+    return question.question if question else None
+
+def export_response(rows, fields, name):
+    """Stream `rows` as NDJSON, or CSV with ?format=csv, without building the whole file"""
+    if http_request.args.get('format') == 'csv':
+        body, mimetype, extension = csv_lines(rows, fields), 'text/csv', 'csv'
+    else:
+        body, mimetype, extension = ndjson(rows), 'application/x-ndjson', 'ndjson'
+    return Response(body, mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename="{name}.{extension}"'})
+
+def bearer_token():
+    """The request's `Authorization: Bearer` token as bytes, ready for secrets.compare_digest"""
+    scheme, _, token = http_request.headers.get('Authorization', '').partition(' ')
+    return token.encode() if scheme.lower() == 'bearer' else b''
+
+def heat_room(game_code, heat):
+    return f'{game_code}/heat{heat}'
+
+def game_bank(game):
+    # A bank is falsy when empty; only a bank whose file has gone falls back to the default
+    bank = QUESTION_BANKS.get(game.bank)
+    if bank is None:
+        bank = QUESTION_BANKS.get('default')
+    return bank if bank is not None else QuestionBank([])
+
+# Roster deltas only go out in the lobby: the lobby pages draw every player, the game page only contestants,
+# so a reconnect storm mid-game doesn't fan a delta out to the whole room per player
+
+def emit_player_added(game_code, game, player, replaces=None):
+    """`replaces` is the sid the player had until now, so a rebind costs one delta rather than a removal and an add.
+    The player's own socket is skipped: its join_success snapshot already has this seq."""
+    if game.state != 'lobby': return
+    game.roster_seq += 1
+    socketio.emit('player_added', {'seq': game.roster_seq, 'player': player.wire(), 'replaces': replaces},
+                  to=game_code, include_self=False)
+
+def emit_player_removed(game_code, game, sid):
+    if game.state != 'lobby': return
+    game.roster_seq += 1
+    socketio.emit('player_removed', {'seq': game.roster_seq, 'sid': sid}, to=game_code)
 
 @app.route('/')
-def index(): return render_template('index.html')
+def index(): return pages.get('index.html')
 @app.route('/join')
-def join(): return render_template('join.html')
+def join(): return pages.get('join.html', code_length=game_codes.length)
 @app.route('/host')
-def host(): return render_template('host.html')
+def host(): return pages.get('host.html', banks=tuple(QUESTION_BANKS.names()))
 @app.route('/how')
-def how(): return render_template('how.html')
+def how(): return pages.get('how.html')
 @app.route('/ai')
-def ai(): return render_template('ai.html')
+def ai(): return pages.get('ai.html')
+@app.route('/metrics')
+def metrics_view():
+    return metrics.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+@app.route('/export')
+def export_view():
+    """Every question asked on this worker, worst correct rate first, or with ?view=rounds every round"""
+    if not EXPORT_TOKEN or not secrets.compare_digest(bearer_token(), EXPORT_TOKEN.encode()):
+        return "Not found", 404
+    if http_request.args.get('view') == 'rounds':
+        return export_response(answer_stats.rounds(), AnswerStats.ROUND_FIELDS, 'rounds')
+    return export_response(answer_stats.questions(describe_question), AnswerStats.QUESTION_FIELDS, 'questions')
+@app.route('/host/<code>/export')
+def host_export(code):
+    """The game's rounds, for its host: the host token goes in `Authorization: Bearer`, never the URL"""
+    game = games.get(code)
+    if not game or not secrets.compare_digest(bearer_token(), game.host_token.encode()):
+        return "Game not found", 404
+    return export_response(answer_stats.rounds(game.host_token), AnswerStats.ROUND_FIELDS, f'game-{code}')
 @app.route('/host/<code>')
 def host_lobby(code):
-    return render_template('host_lobby.html', game_code=code) if code in games else ("Game not found", 404)
+    return pages.get('host_lobby.html', game_code=code) if code in games else ("Game not found", 404)
 @app.route('/student/<code>/lobby')
 def student_lobby(code):
-    return render_template('student_lobby.html', game_code=code) if code in games else ("Game not found", 404)
+    return pages.get('student_lobby.html', game_code=code) if code in games else ("Game not found", 404)
 @app.route('/game/code/<code>')
 def game_view(code):
-    return render_template('game.html', game_code=code) if code in games else ("Game not found", 404)
+    return pages.get('game.html', game_code=code) if code in games else ("Game not found", 404)
 
+# Both take the argument Flask-SocketIO tries first, so the call doesn't raise TypeError and get retried
 @socketio.on('connect')
-def handle_connect():
-    print(f"Client connected: {request.sid}")
+def handle_connect(auth=None):
+    log.debug("connect sid=%s", request.sid)
 
 @socketio.on('disconnect')
-def handle_disconnect():
+def handle_disconnect(reason=None):
     game_code = get_game_code_for_sid(request.sid)
-    if not game_code: return
+    if not game_code:
+        sid_index.pop(request.sid, None)
+        return
+
+    start_scheduler()
+    expiries.expire_at(('disconnect', game_code, request.sid), time.time() + DISCONNECT_GRACE_SECONDS)
 
-    sid = request.sid
+@locks_game()
+def finish_disconnect(game_code, sid):
+    game = games.get(game_code)
+    if not game: return
 
-    def handle_disconnect_delayed():
-        # Wait 30 seconds before removing player to allow reconnection
-        socketio.sleep(30)
-        if game_code not in games: return
+    if game.state == 'redirecting':
+        return
 
-        game = games[game_code]
-        if game.get('state') == 'redirecting':
-            return
-        
-        if sid not in game['players'] and game.get('host_sid') != sid:
-            return
-            
-        if game.get('host_sid') == sid:
-            # Mark host as disconnected instead of ending game immediately
-            game['host_disconnected'] = True
-            game['host_disconnect_time'] = time.time()
-            print(f"Host disconnected from game {game_code}, waiting for reconnection...")
-            
-            # Wait additional time for host reconnection
-            socketio.sleep(30)
-            
-            # Check again if host reconnected
-            if game_code in games and games[game_code].get('host_disconnected'):
-                print(f"Game {game_code} ended - host did not reconnect")
-                socketio.emit('error', {'message': 'The game has closed as the host disconnected'}, to=game_code)
-                games.pop(game_code, None)
-                
-        elif sid in game['players']:
-            username = game['players'][sid].get('username', 'A player')
-            
-            game['disconnected_players'][username] = {
-                'data': game['players'][sid],
-                'score': game['player_scores'].get(sid, 0),
-                'position': game['player_positions'].get(sid),
-                'disconnect_time': time.time()
-            }
-            
-            game['players'].pop(sid, None)
-            game['player_positions'].pop(sid, None)
-            print(f"{username} ({sid}) disconnected from game {game_code}")
-            
-            player_list = [{**p, 'position': game['player_positions'].get(p['sid'])} 
-                          for p in game['players'].values()]
-            socketio.emit('update_player_list', {'players': player_list}, to=game_code)
-
-    socketio.start_background_task(handle_disconnect_delayed)
+    if game.host_sid == sid:
+        # Mark host as disconnected instead of ending game immediately
+        game.host_disconnected = True
+        game.host_disconnect_time = time.time()
+        save_game(game_code, game)
+        log_event(game_code, game, 'host_disconnect', 'host_disconnected', 'host_disconnect_time')
+        log.info("host_disconnected game=%s", game_code)
+
+        # Wait additional time for host reconnection
+        expiries.expire_at(('host', game_code), time.time() + DISCONNECT_GRACE_SECONDS)
+        return
+
+    player = game.by_sid.get(sid)
+    if not player: return
+
+    # Keep the player (score, position, role) so they can pick up where they left off
+    player.disconnect_time = time.time()
+    game.rebind(player, None)
+    sid_index.pop(sid, None)
+    if game_code in chat_rooms:
+        chat_rooms[game_code].forget(sid)
+    emit_player_removed(game_code, game, sid)
+    save_game(game_code, game)
+    expiries.expire_at(('player', game_code, player.id), time.time() + DISCONNECTED_PLAYER_TTL)
+    log_event(game_code, game, 'disconnect', ('players', player.id), 'roster_seq')
+    log.info("player_disconnected game=%s username=%s sid=%s", game_code, player.username, sid)
+
+@locks_game()
+def drop_disconnected_player(game_code, player_id):
+    game = games.get(game_code)
+    if not game: return
+    player = game.players.get(player_id)
+    if not player or player.sid is not None: return
+
+    # Frees their lobby slot too; a later join can reuse it
+    game.drop_player(player)
+    save_game(game_code, game)
+    log_event(game_code, game, 'drop_disconnected', 'players')
+
+@locks_game()
+def expire_idle_game(game_code):
+    game = games.get(game_code)
+    if not game: return False
+    # This worker's heap only knows its own saves; with a shared store another worker may have used the game since
+    if idle_deadline(game) > time.time():
+        expiries.expire_at(('game', game_code), idle_deadline(game))
+        return False
+    log.info("game_expired game=%s state=%s", game_code, game.state)
+    socketio.emit('error', {'message': 'The game has closed after being inactive'}, to=game_code)
+    remove_game(game_code)
+    return True
+
+@locks_game()
+def close_if_host_gone(game_code):
+    game = games.get(game_code)
+    if game and game.host_disconnected:
+        log.info("game_closed game=%s reason=host_gone", game_code)
+        socketio.emit('error', {'message': 'The game has closed as the host disconnected'}, to=game_code)
+        remove_game(game_code)
 
 @socketio.on('host_game')
-def handle_host_game():
-    game_code = generate_game_code()
+def handle_host_game(data=None):
+    bank = (data or {}).get('bank') or 'default'
+    if bank not in QUESTION_BANKS:
+        emit('error', {'message': 'Question bank not found'})
+        return
+    if not QUESTION_BANKS.get(bank):
+        # The file is there but didn't parse (and never has on this worker), or holds no questions
+        emit('error', {'message': 'Question bank could not be loaded'})
+        return
+
     host_token = secrets.token_urlsafe(32)
-    games[game_code] = {
-        'host_sid': request.sid, 'host_token': host_token,
-        'host_verified': False, 'players': {}
-    }
-    initialize_game_state(games[game_code])
+    game = Game(request.sid, host_token, bank)
+    # Claims the code and stores the game in one step, so two hosts can't be handed the same code
+    try:
+        game_code = games.allocate(game, game_codes.take, game_codes.forget)
+    except CodeExhausted:
+        log.error("game_codes_exhausted games=%d", len(games))
+        emit('error', {'message': 'The server is full, please try again later'})
+        return
+    index_sid(request.sid, game_code, 'host')
+    save_game(game_code, game)
+    if journal:
+        # Its first snapshot is written with the next batched flush, not inside this handler
+        journal.snapshot_soon(game_code)
+        schedule_journal_flush()
     join_room(game_code)
-    print(f"Game {game_code} created by {request.sid}")
+    log.info("game_created game=%s bank=%s sid=%s", game_code, bank, request.sid)
     emit('game_created', {'game_code': game_code, 'host_token': host_token})
 
 @socketio.on('verify_host_token')
+@locks_game(lambda data: data.get('game_code'))
 def handle_verify_host_token(data):
     game_code = data.get('game_code')
     token = data.get('host_token')
     game = games.get(game_code)
-    if not game or token != game.get('host_token'):
+    if not game or token != game.host_token:
         emit('access_denied', {'message': 'Invalid game or token'})
         return
 
-    game['host_sid'] = request.sid
-    game['host_verified'] = True
-    game['host_disconnected'] = False  # Clear disconnect flag
+    set_host_sid(game_code, game, request.sid)
+    game.host_verified = True
+    game.host_disconnected = False  # Clear disconnect flag
+    save_game(game_code, game)
+    log_event(game_code, game, 'host', 'host_sid', 'host_verified', 'host_disconnected')
     join_room(game_code)
-    player_list = [{**p, 'position': game['player_positions'].get(p['sid'])} 
-                   for p in game['players'].values()]
-    emit('host_verified', {'game_code': game_code, 'players': player_list})
+    emit('host_verified', {'game_code': game_code, 'players': game.roster(), 'seq': game.roster_seq})
 
 @socketio.on('join_game')
+@locks_game(lambda data: data.get('game_code', '').upper())
 def handle_join_game(data):
     game_code = data.get('game_code', '').upper()
     username = data.get('username', '').strip()
     game = games.get(game_code)
-    
+
     if not game or not username:
         emit('error', {'message': 'Invalid game code or username'})
         return
-    
+
     # PREVENT JOINING IF GAME ALREADY STARTED
-    if game['state'] not in ['lobby', 'redirecting']:
+    if game.state not in ['lobby', 'redirecting']:
         emit('error', {'message': 'This game has already started. You cannot join now.'})
         return
-    
+
     if any(word in BAD_WORDS for word in username.lower().split()):
         emit('banned', {'message': 'nah'})
         socketio.disconnect(request.sid)
         return
 
     join_room(game_code)
-    color = random.choice(AVATAR_COLORS)
-    
-    existing_positions = list(game['player_positions'].values())
-    position = generate_circle_position(existing_positions)
-    game['player_positions'][request.sid] = position
-    
-    game['players'][request.sid] = {
-        'username': username, 
-        'color': color, 
-        'sid': request.sid,
-        'position': position
-    }
-    game['player_scores'][request.sid] = 0
+    # The lobby page joins again on its own socket; its resume token gets the same player back
+    player = game.resume(data.get('resume_token'))
+    if player:
+        rebind_player(game_code, game, player)
+    else:
+        player = game.add_player(request.sid, username, random.choice(AVATAR_COLORS))
+        index_sid(request.sid, game_code, 'player')
+        emit_player_added(game_code, game, player)
+        save_game(game_code, game)
+        log_event(game_code, game, 'join', ('players', player.id), 'next_player_id', 'roster_seq')
 
-    emit('join_success', {'game_code': game_code, 'username': username, 'color': color})
-    player_list = [{**p, 'position': game['player_positions'].get(p['sid'])} 
-                   for p in game['players'].values()]
-    socketio.emit('update_player_list', {'players': player_list}, to=game_code)
+    emit('join_success', {
+        'game_code': game_code, 'username': player.username, 'color': player.color,
+        'resume_token': game.resume_token(player), 'players': game.roster(), 'seq': game.roster_seq
+    })
 
 @socketio.on('announce_in_game')
+@locks_game(lambda data: data.get('game_code'))
 def handle_announce_in_game(data):
     game_code = data.get('game_code')
     game = games.get(game_code)
@@ -250,356 +547,425 @@ def handle_announce_in_game(data):
         return
 
     host_token = data.get('host_token')
-    username = data.get('username')
-    
-    if host_token and host_token == game.get('host_token'):
-        game['host_sid'] = request.sid
-        game['host_verified'] = True
-        game['host_disconnected'] = False  # Clear disconnect flag
+
+    if host_token and host_token == game.host_token:
+        set_host_sid(game_code, game, request.sid)
+        game.host_verified = True
+        game.host_disconnected = False  # Clear disconnect flag
+        save_game(game_code, game)
+        log_event(game_code, game, 'host', 'host_sid', 'host_verified', 'host_disconnected')
         join_room(game_code)
-        
-        used_ids = game.get('questions_used', [])
+
+        used_ids = sorted(game.questions_used)
+        bank = game_bank(game)
+        # Hosts cache the question list by version and skip the download when it hasn't changed
+        cached = data.get('questions_version') == bank.version
 
         emit('identity_confirmed', {
             'is_host': True,
             'username': 'Teacher',
-            'game_state': game['state'],
-            'players': [{**p, 'position': game['player_positions'].get(p['sid'])} 
-                       for p in game['players'].values()],
-            'scores': game['player_scores'],
-            'questions': QUESTIONS,
-            'used_question_ids': used_ids
+            'game_state': game.state,
+            'players': game.roster(),
+            'roster_seq': game.roster_seq,
+            'scores': game.scores(),
+            'questions_version': bank.version,
+            'questions_json': None if cached else bank.payload,
+            'used_question_ids': used_ids,
+            'phase_deadline': game.phase_deadline,
+            'server_time': time.time()
         })
         return
 
-    elif username:
+    player = game.resume(data.get('resume_token'))
+    if player:
         join_room(game_code)
-        old_sid = None
-        player_data = None
-        
-        # Check if this is a reconnecting player
-        if username in game.get('disconnected_players', {}):
-            # Restore player from disconnected state
-            disconnected_data = game['disconnected_players'].pop(username)
-            player_data = disconnected_data['data']
-            player_data['sid'] = request.sid
-            
-            game['players'][request.sid] = player_data
-            game['player_scores'][request.sid] = disconnected_data['score']
-            game['player_positions'][request.sid] = disconnected_data['position']
-            
-            print(f"Player {username} reconnected with new SID {request.sid}")
-        else:
-            # Find player by username
-            for sid, p_data in list(game['players'].items()):
-                if p_data['username'] == username:
-                    old_sid = sid
-                    player_data = p_data
-                    break
-        
-        if player_data:
-            if old_sid and old_sid != request.sid:
-                game['players'][request.sid] = game['players'].pop(old_sid)
-                
-                if old_sid in game['player_scores']:
-                    game['player_scores'][request.sid] = game['player_scores'].pop(old_sid)
-                
-                if old_sid in game['player_positions']:
-                    game['player_positions'][request.sid] = game['player_positions'].pop(old_sid)
-                
-                update_contestant_audience_sids(game, old_sid, request.sid)
-
-            game['players'][request.sid]['sid'] = request.sid
-            my_score = game['player_scores'].get(request.sid, 0)
-            
-            is_contestant = request.sid in game['current_contestants']
-            is_audience = request.sid in game['current_audience']
-            current_question_data = None
-            
-            if game['current_question'] and game['state'] in ['answering', 'voting']:
-                current_question_data = {
-                    'question': game['current_question']['question'],
-                    'options': game['current_question']['options']
-                }
-            
-            response_data = {
-                'is_host': False, 
-                'username': player_data['username'], 
-                'color': player_data['color'],
-                'my_score': my_score,
-                'game_state': game['state'], 
-                'players': [{**p, 'position': game['player_positions'].get(p['sid'])} 
-                           for p in game['players'].values()],
-                'is_contestant': is_contestant,
-                'is_audience': is_audience,
-                'current_question': current_question_data,
-                'current_contestants': [
-                    {**p, 'sid': sid} for sid, p in game['current_contestants'].items()
-                ]
-            }
-            
-            emit('identity_confirmed', response_data)
-            return
+        rebind_player(game_code, game, player)
+
+        heat = game.heat_players(player.heat) if player.heat is not None else []
+        response_data = {
+            **game.snapshot(),
+            'username': player.username,
+            'color': player.color,
+            'my_score': player.score,
+            'my_rank': game.leaderboard.rank(player.id),
+            'current_contestants': [p.wire() for p in heat],
+            'is_contestant': player.role == 'contestant',
+            'is_audience': player.role == 'audience',
+            'server_time': time.time()
+        }
+        if game_code in chat_rooms:
+            response_data['chat_history'] = chat_rooms[game_code].since(data.get('chat_seq') or 0)
+
+        emit('identity_confirmed', response_data)
+        return
 
     emit('error', {'message': 'You did not create this game'})
 
+def rebind_player(game_code, game, player):
+    """Same player on a new socket, or back from a disconnect: rebind the sid, everything else stays put"""
+    old_sid = player.sid
+    if old_sid == request.sid: return
+    if old_sid is not None:
+        sid_index.pop(old_sid, None)
+    else:
+        log.info("player_reconnected game=%s username=%s sid=%s", game_code, player.username, request.sid)
+    game.rebind(player, request.sid)
+    player.disconnect_time = None
+    index_sid(request.sid, game_code, 'player')
+    if player.heat is not None:
+        join_room(heat_room(game_code, player.heat))
+    emit_player_added(game_code, game, player, replaces=old_sid)
+    save_game(game_code, game)
+    log_event(game_code, game, 'reconnect', ('players', player.id), 'roster_seq')
+
+@socketio.on('request_player_list')
+@locks_game(sid_game_code)
+def handle_request_player_list():
+    game_code = get_game_code_for_sid(request.sid)
+    game = games.get(game_code)
+    if not game: return
+    emit('update_player_list', {'players': game.roster(), 'seq': game.roster_seq})
+
 @socketio.on('start_game')
+@locks_game(sid_game_code)
 def handle_start_game():
     game_code = get_game_code_for_sid(request.sid)
     game = games.get(game_code)
-    if not game or game['host_sid'] != request.sid or not game['host_verified']:
+    if not game or game.host_sid != request.sid or not game.host_verified:
         emit('error', {'message': 'Only the host can start the game'})
         return
-    if len(game['players']) < 2:
+    if len(game.by_sid) < 2:
         emit('error', {'message': 'Need at least two players to start'})
         return
 
-    game['state'] = 'redirecting' 
+    game.state = 'redirecting'
+    save_game(game_code, game)
+    log_event(game_code, game, 'start', 'state')
     socketio.emit('redirect_to_game', {'game_code': game_code}, to=game_code)
 
 @socketio.on('teacher_selects_question')
+@locks_game(sid_game_code)
 def handle_teacher_selects_question(data):
     game_code = get_game_code_for_sid(request.sid)
     game = games.get(game_code)
-    if not game or game['host_sid'] != request.sid:
+    if not game or game.host_sid != request.sid:
         return
 
-    if game.get('timer_task') and game['timer_task'].is_alive():
+    if game.state in ['answering', 'voting', 'results']:
         emit('error', {'message': 'A round is already in progress'})
         return
 
     question_id = data.get('question_id')
-    question = next((q for q in QUESTIONS if q['id'] == question_id), None)
-    
-    if not question or question_id in game['questions_used']:
+    question = game_bank(game).get(question_id)
+
+    if not question or question_id in game.questions_used:
         emit('error', {'message': 'Question invalid'})
         return
 
-    all_player_sids = list(game['players'].keys())
-    if len(all_player_sids) < 2:
+    all_players = game.connected()
+    if len(all_players) < 2:
         emit('error', {'message': 'You need at least two players to start a round'})
         socketio.emit('phase_change', {'phase': 'waiting', 'message': 'Waiting for more players...'}, to=game_code)
         return
-    
-    if len(game['contestants_this_round']) >= len(all_player_sids):
-        game['contestants_this_round'] = []
-        game['round_number'] += 1
-    
-    available_players = [sid for sid in all_player_sids if sid not in game['contestants_this_round']]
-    
-    if len(available_players) < 2:
-        available_players = all_player_sids
-        game['contestants_this_round'] = []
-    
-    random.shuffle(available_players)
-    contestant_sids = available_players[:2]
-    
-    print(f"Round starting in game {game_code}")
-    print(f"Selected contestants: {contestant_sids}")
-    print(f"All players: {all_player_sids}")
-    
-    game['contestants_this_round'].extend(contestant_sids)
-    
-    game['state'] = 'answering'
-    game['questions_used'].append(question_id)
-    game['current_question'] = question
-    game['current_answers'] = {}
-    game['current_votes'] = {}
-    
-    game['current_contestants'] = {sid: game['players'][sid] for sid in contestant_sids}
-    game['current_audience'] = {sid: game['players'][sid] for sid in all_player_sids if sid not in contestant_sids}
-    
+
+    # Parallel heats: each needs a contestant pair and at least two voters
+    heats = data.get('heats')
+    heats = max(1, min(heats if type(heats) is int else 1, len(all_players) // 4))
+
+    for player in all_players:
+        if player.heat is not None:
+            leave_room(heat_room(game_code, player.heat), sid=player.sid)
+    game.start_round(question, heats)
+    for player in all_players:
+        join_room(heat_room(game_code, player.heat), sid=player.sid)
+
+    log.info("round_started game=%s question=%s heats=%d contestants=%s players=%d", game_code, question_id,
+             len(game.heats), ','.join(p.username for p in game.contestant_players()), len(all_players))
+
+    game.state = 'answering'
+    game.questions_used.add(question_id)
+    log_event(game_code, game, 'round', 'round_number', 'rotation', 'heats', 'questions_used', 'players',
+              'current_question', 'answers', 'votes', 'contestants', 'round_size')
+    start_phase(game_code, game, ANSWER_SECONDS)
+
     emit('question_selected', {'question_id': question_id}, to=request.sid)
-    
+
     payload = {
-        'question': question['question'],
-        'options': question['options'],
-        'contestants': [game['players'][sid] for sid in contestant_sids]
+        'question': question.question,
+        'options': question.options,
+        'deadline': game.phase_deadline,
+        'server_time': time.time()
     }
-    
-    # Send general round start info to everyone
-    socketio.emit('new_round_started', payload, to=game_code)
-    
-    # Give clients a moment to process the round start
-    socketio.sleep(0.1)
-    
-    for sid in contestant_sids:
-        socketio.emit('show_contestant_interface', {
-            'question': question['question']
-        }, to=sid)
-    
-    audience_sids = [sid for sid in all_player_sids if sid not in contestant_sids]
-    for sid in audience_sids:
-        socketio.emit('show_audience_interface', {
-            'question': question['question'],
-            'options': question['options']
-        }, to=sid)
-    
-    game['timer_task'] = socketio.start_background_task(run_round_timer, game_code)
-
-def run_round_timer(game_code):
-    game = games.get(game_code)
-    if not game: return
 
-    game['state'] = 'answering'
-    # 30 second answering phase
-    for i in range(30, 0, -1):
-        socketio.emit('timer_update', {'time': i, 'phase': 'Answering'}, to=game_code)
-        socketio.sleep(1)
-    
-    game['state'] = 'voting'
-
-    contestant_answers_for_voting = {
-        sid: {
-            'username': data['username'],
-            'sid': sid,
-            'answer': game['current_answers'].get(sid, "No answer submitted")
-        } for sid, data in game['current_contestants'].items()
+    # One broadcast per heat; clients pick their contestant/audience view from their heat's 'contestants'
+    for heat in range(len(game.heats)):
+        socketio.emit('new_round_started', {**payload, 'heat': heat,
+                                            'contestants': [p.wire() for p in game.heat_players(heat)]},
+                      to=heat_room(game_code, heat))
+    socketio.emit('new_round_started', {**payload, 'contestants': [p.wire() for p in game.contestant_players()],
+                                        'heats': [[p.wire() for p in game.heat_players(heat)]
+                                                  for heat in range(len(game.heats))]},
+                  to=game.host_sid)
+
+def start_phase(game_code, game, seconds):
+    """Save the game with a new phase deadline and schedule the transition out of it"""
+    game.phase_id += 1
+    game.phase_deadline = time.time() + seconds
+    save_game(game_code, game)
+    log_event(game_code, game, 'phase', 'state', 'phase_id', 'phase_deadline')
+    scheduler.cancel(phase_timers.get(game_code))
+    phase_timers[game_code] = schedule(seconds, advance_phase, game_code, game.phase_id)
+
+@locks_game()
+def advance_phase(game_code, phase_id):
+    game = games.get(game_code)
+    if not game or game.phase_id != phase_id: return
+
+    if game.state == 'answering':
+        game.state = 'voting'
+        start_phase(game_code, game, VOTE_SECONDS)
+
+        # Each heat's audience votes between its own pair; the host sees every heat
+        for heat in range(len(game.heats)):
+            socketio.emit('phase_change', {
+                'phase': 'voting', 'answers': voting_answers(game, game.heat_players(heat)), 'heat': heat,
+                'deadline': game.phase_deadline, 'server_time': time.time()
+            }, to=heat_room(game_code, heat))
+        socketio.emit('phase_change', {
+            'phase': 'voting', 'answers': voting_answers(game, game.contestant_players()),
+            'deadline': game.phase_deadline, 'server_time': time.time()
+        }, to=game.host_sid)
+
+    elif game.state == 'voting':
+        game.state = 'results'
+        start_phase(game_code, game, RESULTS_SECONDS)
+        socketio.emit('phase_change', {'phase': 'results'}, to=game_code)
+        calculate_and_show_results(game_code)
+
+    elif game.state == 'results':
+        phase_timers.pop(game_code, None)
+        finish_round(game_code, game)
+
+def voting_answers(game, contestants):
+    return {
+        p.sid: {
+            'username': p.username,
+            'sid': p.sid,
+            'heat': p.heat,
+            'answer': game.answers.get(p.id, "No answer submitted")
+        } for p in contestants
     }
-    socketio.emit('phase_change', {'phase': 'voting', 'answers': contestant_answers_for_voting}, to=game_code)
-    
-    # 15 second voting phase
-    for i in range(15, 0, -1):
-        socketio.emit('timer_update', {'time': i, 'phase': 'Voting'}, to=game_code)
-        socketio.sleep(1)
-    
-    game['state'] = 'results'
-    socketio.emit('phase_change', {'phase': 'results'}, to=game_code)
-    calculate_and_show_results(game_code)
 
+def all_submitted(game):
+    if game.state == 'answering':
+        return len(game.answers) >= game.round_size
+    if game.state == 'voting':
+        return len(game.votes) >= game.round_size - len(game.contestants)
+    return False
+
+@locks_game()
 def calculate_and_show_results(game_code):
     game = games.get(game_code)
-    if not game or not game['current_question']: return
-
-    correct_idx = game['current_question']['correct_answer_index']
-    
-    # Award points to audience members who got it right
-    for sid, answer in game['current_answers'].items():
-        if sid in game['current_audience']:
-            if answer == correct_idx:
-                game['player_scores'][sid] = game['player_scores'].get(sid, 0) + 100
-
-    # Count votes for contestants
-    vote_counts = {sid: 0 for sid in game['current_contestants']}
-    for voter, voted_for in game['current_votes'].items():
-        if voted_for in vote_counts:
-            vote_counts[voted_for] += 1
-    
-    # Award points to contestants with most votes
-    if vote_counts:
-        max_votes = max(vote_counts.values())
+    if not game or not game.current_question: return
+
+    correct_idx = game.current_question.correct_answer_index
+
+    # Award points to audience members who got it right; the answer handler kept this set up to date
+    awarded = []
+    for pid in game.correct_answers:
+        player = game.players.get(pid)
+        if player:
+            game.award(player, 100)
+            awarded.append(player)
+
+    vote_counts = game.vote_counts
+
+    # Award points to the contestants with most votes in each heat
+    for pair in game.heats:
+        max_votes = max((vote_counts.get(pid, 0) for pid in pair), default=0)
         if max_votes > 0:
-            winners = [sid for sid, count in vote_counts.items() if count == max_votes]
+            winners = [pid for pid in pair if vote_counts.get(pid, 0) == max_votes]
             points_per_winner = 300 // len(winners)
-            for winner_sid in winners:
-                if winner_sid in game['player_scores']:
-                    game['player_scores'][winner_sid] += points_per_winner
+            for winner_id in winners:
+                if winner_id in game.players:
+                    game.award(game.players[winner_id], points_per_winner)
+                    awarded.append(game.players[winner_id])
+    save_game(game_code, game)
+    if awarded:
+        log_event(game_code, game, 'scores', *[('players', p.id) for p in awarded])
 
     results_payload = {
-        'correct_answer': game['current_question']['options'][correct_idx],
+        'correct_answer': game.current_question.options[correct_idx],
         'correct_index': correct_idx,
         'contestant_answers': {
-            sid: {
-                'username': data['username'],
-                'answer': game['current_answers'].get(sid, "No answer"),
-                'votes': vote_counts.get(sid, 0)
-            } for sid, data in game['current_contestants'].items()
+            p.sid: {
+                'username': p.username,
+                'heat': p.heat,
+                'answer': game.answers.get(p.id, "No answer"),
+                'votes': vote_counts.get(p.id, 0)
+            } for p in game.contestant_players()
         }
     }
     socketio.emit('show_results', results_payload, to=game_code)
-    
-    # Send individual score updates to ALL players
-    for sid in game['players']:
-        socketio.emit('update_my_score', {'score': game['player_scores'].get(sid, 0)}, to=sid)
 
-    socketio.sleep(10)
-    
+    # One broadcast: the top 10, a score -> rank table and only the scores that changed; clients find their own rank
+    socketio.emit('update_scores', game.standings(awarded), to=game_code)
+
+    # After the emits, so a stats failure costs the export a row rather than the room its results
+    try:
+        answer_stats.record(game_code, game)
+    except Exception:
+        log.exception("answer_stats_failed game=%s", game_code)
+
+def finish_round(game_code, game):
     # Check if game is over
-    if len(game['questions_used']) >= len(QUESTIONS):
-        game['state'] = 'game_over'
-        
-        if not game['player_scores']:
+    if len(game.questions_used) >= len(game_bank(game)):
+        game.state = 'game_over'
+        save_game(game_code, game)
+        log_event(game_code, game, 'game_over', 'state')
+
+        # The leaderboard's top bucket is the connected players on the best score
+        max_score, leader_ids = game.leaderboard.leaders()
+        if not leader_ids:
             socketio.emit('game_over', {'is_tie': True, 'winners': []}, to=game_code)
             return
-            
-        max_score = max(game['player_scores'].values())
-        winner_sids = [sid for sid, score in game['player_scores'].items() if score == max_score and sid in game['players']]
-        
-        if len(winner_sids) > 1:
-            winners_data = []
-            for sid in winner_sids:
-                if sid in game['players']:
-                    winners_data.append({
-                        'username': game['players'][sid]['username'],
-                        'color': game['players'][sid]['color'],
-                        'score': max_score
-                    })
-            
+
+        winners = [game.players[pid] for pid in leader_ids]
+
+        if len(winners) > 1:
             socketio.emit('game_over', {
                 'is_tie': True,
-                'winners': winners_data
+                'winners': [{'username': p.username, 'color': p.color, 'score': max_score} for p in winners]
             }, to=game_code)
         else:
-            winner_sid = winner_sids[0]
-            if winner_sid in game['players']:
-                winner_data = game['players'][winner_sid]
-                socketio.emit('game_over', {
-                    'is_tie': False,
-                    'winner': {
-                        'username': winner_data['username'],
-                        'color': winner_data['color'],
-                        'score': max_score
-                    }
-                }, to=game_code)
-            else:
-                socketio.emit('game_over', {'is_tie': True, 'winners': []}, to=game_code)
+            winner = winners[0]
+            socketio.emit('game_over', {
+                'is_tie': False,
+                'winner': {
+                    'username': winner.username,
+                    'color': winner.color,
+                    'score': max_score
+                }
+            }, to=game_code)
     else:
-        game['state'] = 'intermission'
+        game.state = 'intermission'
+        save_game(game_code, game)
+        log_event(game_code, game, 'intermission', 'state')
         socketio.emit('prepare_for_next_round', to=game_code)
 
 @socketio.on('player_submit_answer')
+@locks_game(sid_game_code)
 def handle_player_submit_answer(data):
     game_code = get_game_code_for_sid(request.sid)
     game = games.get(game_code)
     if not game: return
-    
-    game['current_answers'][request.sid] = data.get('answer')
+    player = game.by_sid.get(request.sid)
+    if not player or player.role is None: return
+
+    seconds = ANSWER_SECONDS - (game.phase_deadline - time.time()) if game.state == 'answering' else None
+    game.record_answer(player, data.get('answer'), seconds)
+    save_game(game_code, game)
+    log_event(game_code, game, 'answer', ('answers', player.id),
+              *[('answer_seconds', player.id)] if seconds is not None else [])
     emit('answer_received')
+    queue_live_tally(game_code)
+    if all_submitted(game):
+        socketio.emit('all_submitted', {'phase': game.state}, to=game.host_sid)
 
 @socketio.on('player_submit_vote')
+@locks_game(sid_game_code)
 def handle_player_submit_vote(data):
     game_code = get_game_code_for_sid(request.sid)
     game = games.get(game_code)
     if not game: return
-
-    if request.sid in game['current_audience'] and request.sid not in game['current_votes']:
-        game['current_votes'][request.sid] = data.get('contestant_sid')
+    player = game.by_sid.get(request.sid)
+
+    if player and player.role == 'audience' and player.id not in game.votes:
+        contestant = game.by_sid.get(data.get('contestant_sid'))
+        # Only a contestant in the voter's own heat counts; anything else is recorded as an abstention
+        valid = contestant and contestant.role == 'contestant' and contestant.heat == player.heat
+        game.record_vote(player, contestant.id if valid else None)
+        save_game(game_code, game)
+        log_event(game_code, game, 'vote', ('votes', player.id))
         emit('vote_received')
+        queue_live_tally(game_code)
+        if all_submitted(game):
+            socketio.emit('all_submitted', {'phase': game.state}, to=game.host_sid)
+
+def queue_live_tally(game_code):
+    # However many submissions arrive, the host gets at most one live_tally per LIVE_TALLY_SECONDS
+    if game_code not in tally_flushes:
+        tally_flushes[game_code] = schedule(LIVE_TALLY_SECONDS, flush_live_tally, game_code)
+
+@locks_game()
+def flush_live_tally(game_code):
+    tally_flushes.pop(game_code, None)
+    game = games.get(game_code)
+    if game and game.host_sid and game.state in ['answering', 'voting']:
+        socketio.emit('live_tally', game.tally(), to=game.host_sid)
+
+@socketio.on('end_phase')
+@locks_game(sid_game_code)
+def handle_end_phase():
+    game_code = get_game_code_for_sid(request.sid)
+    game = games.get(game_code)
+    if not game or game.host_sid != request.sid:
+        return
+    if game.state not in ['answering', 'voting']:
+        return
+
+    scheduler.cancel(phase_timers.pop(game_code, None))
+    advance_phase(game_code, game.phase_id)
 
 @socketio.on('send_message')
+@locks_game(sid_game_code)
 def handle_send_message(data):
     game_code = get_game_code_for_sid(request.sid)
     game = games.get(game_code)
-    if not game or request.sid == game['host_sid']: return
+    if not game or request.sid == game.host_sid: return
 
-    player_data = game['players'].get(request.sid)
-    if not player_data: return
+    player = game.by_sid.get(request.sid)
+    if not player: return
 
-    current_time = time.time()
-    last_message_time = player_data.get('last_message_time', 0)
-    if current_time - last_message_time < 1.0:
+    message = data.get('message', '').strip()
+    if not message: return
+
+    room = chat_rooms.get(game_code)
+    if room is None:
+        room = chat_rooms[game_code] = ChatRoom()
+    accepted = room.submit(request.sid, {
+        'user': player.username,
+        'text': message,
+        'color': player.color
+    })
+    if not accepted:
         emit('error', {'message': 'Please wait before sending another message'})
         return
-    
-    player_data['last_message_time'] = current_time
 
-    message = data.get('message', '').strip()
-    if message:
-        socketio.emit('new_message', {
-            'user': player_data['username'],
-            'text': message,
-            'color': player_data['color']
-        }, to=game_code, include_self=True)
+    # Lines arriving within one batch window go out together as a single new_messages emit
+    if game_code not in chat_flushes:
+        chat_flushes[game_code] = schedule(CHAT_BATCH_SECONDS, flush_chat, game_code)
+
+@locks_game()
+def flush_chat(game_code):
+    chat_flushes.pop(game_code, None)
+    room = chat_rooms.get(game_code)
+    batch = room.drain() if room else []
+    if batch:
+        socketio.emit('new_messages', {'messages': batch}, to=game_code)
+
+def startup():
+    """Work an entry point does once its transport is in place"""
+    # Logging is set up here rather than at import so importing app (tests, benchmarks) leaves the root logger alone
+    setup_queue_logging()
+    # Sample the shared lobby placement levels here, not inside the joins that first reach each level
+    CirclePlacer().prepare()
+    if journal:
+        recover_games()
 
 if __name__ == '__main__':
+    # Development server; production runs the ASGI entry point: uvicorn asgi:application
+    # debug=True runs the server in a reloader child; only that process should own recovered games
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        startup()
     socketio.run(app, debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
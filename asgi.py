@@ -0,0 +1,147 @@
+"""Run the game on python-socketio's AsyncServer under an ASGI server instead of Flask-SocketIO.
+
+    uvicorn asgi:application --host 0.0.0.0 --port 5000
+
+The handlers, store, scheduler and sweeper in app.py are reused as they are. They stay synchronous:
+each runs to completion while its emits, room joins and disconnects are queued, then the queue is
+awaited. With the in-memory store they run on the event loop itself. With GAME_STORE_URL set they
+run in the loop's thread pool, since Redis round trips and waits for another worker's game lock
+would otherwise stall every connection in the process. Timers run from one asyncio task that drains
+the shared scheduler, the same way. The Flask routes are mounted through asgiref's WSGI adapter.
+"""
+import asyncio
+import collections
+import os
+import threading
+
+import socketio
+from asgiref.wsgi import WsgiToAsgi
+
+import app as game
+from game_store import InMemoryGameStore
+
+SCHEDULER_TICK = game.SCHEDULER_TICK
+
+
+class Outbox:
+    """Socket operations queued by sync handlers, awaited in order once the handler returns"""
+
+    def __init__(self, server):
+        self.server = server
+        self.ops = collections.deque()  # appended from handler threads, drained on the loop
+        self.lock = asyncio.Lock()
+
+    def add(self, op, *args, **kwargs):
+        self.ops.append((op, args, kwargs))
+
+    async def flush(self):
+        # One flusher at a time so emits leave in the order handlers queued them
+        async with self.lock:
+            while self.ops:
+                op, args, kwargs = self.ops.popleft()
+                await getattr(self.server, op)(*args, **kwargs)
+
+
+class AsyncRequest(threading.local):
+    """Stands in for flask.request: `sid` is the client whose event the current thread is handling"""
+    sid = None
+
+
+class AsyncTransport:
+    """The slice of the Flask-SocketIO API app.py calls, backed by the outbox"""
+
+    def __init__(self, outbox, request):
+        self.outbox = outbox
+        self.request = request
+
+    def emit(self, event, *args, to=None, room=None, include_self=True, **kwargs):
+        game.metrics.emitted(event)
+        skip_sid = None if include_self else self.request.sid
+        self.outbox.add('emit', event, args[0] if args else None, to=to or room, skip_sid=skip_sid)
+
+    def emit_to_sender(self, event, *args, to=None, **kwargs):
+        self.emit(event, *args, to=to or self.request.sid, **kwargs)
+
+    def join_room(self, room, sid=None):
+        self.outbox.add('enter_room', sid or self.request.sid, room)
+
+    def leave_room(self, room, sid=None):
+        self.outbox.add('leave_room', sid or self.request.sid, room)
+
+    def disconnect(self, sid):
+        self.outbox.add('disconnect', sid)
+
+
+def adapt(event, handler, outbox, request, offload):
+    # python-socketio passes (environ, auth) to connect and a reason to disconnect; the app's handlers use neither
+    drop_args = event in ('connect', 'disconnect')
+
+    def run(sid, args):
+        request.sid = sid
+        try:
+            return handler() if drop_args else handler(*args)
+        finally:
+            request.sid = None
+
+    async def async_handler(sid, *args):
+        if offload:
+            result = await asyncio.get_running_loop().run_in_executor(None, run, sid, args)
+        else:
+            result = run(sid, args)
+        await outbox.flush()
+        return result
+    return async_handler
+
+
+async def scheduler_loop(outbox, offload):
+    while True:
+        if offload:
+            delay = await asyncio.get_running_loop().run_in_executor(None, game.scheduler.run_due)
+        else:
+            delay = game.scheduler.run_due()
+        await outbox.flush()
+        await asyncio.sleep(SCHEDULER_TICK if delay is None else min(delay, SCHEDULER_TICK))
+
+
+def create_app():
+    queue_url = os.environ.get('SOCKETIO_MESSAGE_QUEUE')
+    manager = socketio.AsyncRedisManager(queue_url) if queue_url else None
+    server = socketio.AsyncServer(async_mode='asgi', cors_allowed_origins='*', client_manager=manager,
+                                  serializer=game.metrics.packet_class(game.SOCKETIO_SERIALIZER))
+    outbox = Outbox(server)
+    request = AsyncRequest()
+    transport = AsyncTransport(outbox, request)
+
+    handlers = game.socketio.event_handlers
+    # A shared store blocks on the network and on other workers' locks; keep that off the event loop
+    offload = not isinstance(game.games, InMemoryGameStore)
+
+    # Point the names app.py's handlers use at the asyncio transport
+    game.request = request
+    game.socketio = transport
+    game.emit = transport.emit_to_sender
+    game.join_room = transport.join_room
+    game.leave_room = transport.leave_room
+    for event, handler in handlers.items():
+        server.on(event, adapt(event, handler, outbox, request, offload))
+
+    tasks = []
+
+    async def on_startup():
+        # scheduler_loop() stands in for app.run_scheduler(); mark it started so app.py doesn't spawn one
+        game._scheduler_task = tasks
+        game.scheduler.call_later(game.SWEEP_SECONDS, game.sweep_expired)
+        game.startup()
+        tasks.append(asyncio.create_task(scheduler_loop(outbox, offload)))
+
+    async def on_shutdown():
+        for task in tasks:
+            task.cancel()
+        if game.journal:
+            game.journal.close()
+
+    return socketio.ASGIApp(server, other_asgi_app=WsgiToAsgi(game.app),
+                            on_startup=on_startup, on_shutdown=on_shutdown)
+
+
+application = create_app()
@@ -0,0 +1,83 @@
+"""Record a million rounds into AnswerStats and time streaming them out of /export as NDJSON and CSV.
+
+    python benchmarks/answer_export.py --rounds 1000000 --audience 30
+
+Rounds are spread over games of 10 questions from a 60-question bank, each with --audience answers and
+response times. Reported: time spent in AnswerStats.add, bytes of the round log per round, and for each
+export the rows, bytes and time, and how much the worker's peak RSS grew while streaming it (the export
+should not need memory in proportion to its size). Exports are read chunk by chunk from the Flask test client.
+"""
+import argparse
+import os
+import random
+import resource
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as game_app
+from answer_stats import AnswerStats
+
+
+def fill(stats, rounds, audience, rng):
+    """Record `rounds` made-up rounds; returns the seconds spent inside AnswerStats.add"""
+    spent = 0
+    for n in range(rounds):
+        correct_index = rng.randrange(4)
+        option_counts = [0, 0, 0, 0]
+        for _ in range(audience):
+            option_counts[correct_index if rng.random() < 0.6 else rng.randrange(4)] += 1
+        seconds = sorted(rng.uniform(1, 30) for _ in range(audience))
+        game = n // 10
+        code, question_id = f'G{game % 1679616:04d}', rng.randrange(1, 61)
+        start = time.perf_counter()
+        stats.add(code, game, 'default', question_id, correct_index, option_counts, option_counts[correct_index], seconds)
+        spent += time.perf_counter() - start
+    return spent
+
+
+def log_bytes(stats):
+    return sum(column.buffer_info()[1] * column.itemsize for column in (
+        stats._ended_at, stats._game, stats._bank, stats._question_id, stats._correct_index, stats._answered,
+        stats._correct, stats._p50_ms, stats._p90_ms, stats._offsets, stats._option_counts))
+
+
+def peak_rss():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def export(client, url, headers):
+    before = peak_rss()
+    start = time.perf_counter()
+    response = client.get(url, headers=headers, buffered=False)
+    size = lines = 0
+    for chunk in response.response:
+        size += len(chunk)
+        lines += chunk.count('\n' if isinstance(chunk, str) else b'\n')
+    response.close()
+    return lines, size, time.perf_counter() - start, peak_rss() - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=1000000)
+    parser.add_argument('--audience', type=int, default=30)
+    args = parser.parse_args()
+
+    stats = game_app.answer_stats = AnswerStats()
+    elapsed = fill(stats, args.rounds, args.audience, random.Random(1))
+    print(f'recorded {len(stats)} rounds in {elapsed:.1f}s ({len(stats) / elapsed:,.0f}/s), '
+          f'round log {log_bytes(stats) / 1e6:.1f} MB ({log_bytes(stats) / len(stats):.0f} bytes/round)')
+
+    client = game_app.app.test_client()
+    game_app.EXPORT_TOKEN = 'answer-export-benchmark'
+    headers = {'Authorization': f'Bearer {game_app.EXPORT_TOKEN}'}
+    for url in ('/export?view=rounds', '/export?view=rounds&format=csv', '/export', '/export?format=csv'):
+        lines, size, seconds, grown = export(client, url, headers)
+        print(f'  {url:<32} {lines:9d} lines {size / 1e6:8.1f} MB {seconds:6.1f}s '
+              f'({size / 1e6 / seconds:5.1f} MB/s)  peak RSS +{grown / 1e6:.1f} MB')
+
+
+if __name__ == '__main__':
+    main()
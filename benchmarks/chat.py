@@ -0,0 +1,55 @@
+"""Push a chat burst through ChatRoom and count the emits that reach the room.
+
+    python benchmarks/chat.py --players 150 --seconds 10 --rate 5
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chat import ChatRoom
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--players', type=int, default=150)
+    parser.add_argument('--seconds', type=float, default=10.0, help='simulated burst length')
+    parser.add_argument('--rate', type=float, default=5.0, help='messages per player per second attempted')
+    parser.add_argument('--window', type=float, default=0.1, help='batch window in seconds')
+    args = parser.parse_args()
+
+    clock = [0.0]
+    room = ChatRoom(clock=lambda: clock[0])
+    rng = random.Random(1)
+    arrivals = sorted(
+        (rng.uniform(0, args.seconds), f'sid{p}')
+        for p in range(args.players) for _ in range(int(args.rate * args.seconds))
+    )
+
+    accepted = emits = delivered = 0
+    next_flush = args.window
+    started = time.perf_counter()
+    for at, sid in arrivals:
+        while at >= next_flush:
+            batch = room.drain()
+            if batch:
+                emits += 1
+                delivered += len(batch)
+            next_flush += args.window
+        clock[0] = at
+        accepted += room.submit(sid, {'user': sid, 'text': 'hello', 'color': '#FFFFFF'})
+    batch = room.drain()
+    emits += bool(batch)
+    delivered += len(batch)
+    elapsed = time.perf_counter() - started
+
+    print(f"{len(arrivals)} messages attempted, {accepted} accepted, {delivered} delivered in {emits} room emits")
+    print(f"room emits/s: {emits / args.seconds:.1f} batched vs {len(arrivals) / args.seconds:.0f} unbatched and unlimited")
+    print(f"pipeline throughput: {len(arrivals) / elapsed:,.0f} submits/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,219 @@
+"""Hammer the socket handlers from many threads at once and check that no answer, vote or point is lost.
+
+    python benchmarks/contention.py --games 8 --players 40
+
+Every game runs one round with all of its students answering, then voting, at the same instant from
+their own threads, while the other games do the same. Afterwards each game's answers, votes and
+scores are compared with what the clients sent, and the running answer and vote tallies with the
+answers and votes stored. The tallies yield to other threads between reading a count and writing it
+back, so a handler running outside its game's lock loses increments. Many hosts also claim game codes
+concurrently to check that allocation never hands out one code twice. --no-locks switches the
+per-game locks off and should fail. Set GAME_STORE_URL to run against Redis, where every handler works
+on its own unpickled copy of the game and unlocked saves overwrite each other. --fakeredis N runs the
+Redis store without a server: N RedisGameStores share one fakeredis server (pip install 'fakeredis[lua]')
+and each thread uses one of them, as N worker processes would, so only the Redis locks keep them apart.
+"""
+import argparse
+import itertools
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as game_app
+from game_store import NO_LOCK, GameStore, RedisGameStore
+
+try:
+    import fakeredis
+except ImportError:  # only --fakeredis needs it
+    fakeredis = None
+
+
+def received(client, name):
+    return [packet['args'][0] if packet['args'] else None
+            for packet in client.get_received() if packet['name'] == name]
+
+
+class WorkerStores(GameStore):
+    """N RedisGameStores on one fakeredis server, each thread sticking to one of them like a worker process"""
+
+    def __init__(self, count):
+        server = fakeredis.FakeServer()
+        self.stores = [RedisGameStore(client=fakeredis.FakeRedis(server=server)) for _ in range(count)]
+        self._thread = threading.local()
+        self._next = itertools.count()
+
+    def _store(self):
+        store = getattr(self._thread, 'store', None)
+        if store is None:
+            store = self._thread.store = self.stores[next(self._next) % len(self.stores)]
+        return store
+
+    def get(self, code, default=None): return self._store().get(code, default)
+    def save(self, code, game): return self._store().save(code, game)
+    def pop(self, code, default=None): return self._store().pop(code, default)
+    def codes(self): return self._store().codes()
+    def add(self, code, game): return self._store().add(code, game)
+    def lock(self, code): return self._store().lock(code)
+    def __contains__(self, code): return code in self._store()
+
+
+class YieldingList(list):
+    """A tally whose `counts[i] += 1` lets other threads run between the read and the write"""
+
+    def __getitem__(self, index):
+        value = super().__getitem__(index)
+        time.sleep(0)
+        return value
+
+
+class YieldingDict(dict):
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        time.sleep(0)
+        return value
+
+
+def run_all(fns):
+    barrier = threading.Barrier(len(fns))
+
+    def run(fn):
+        barrier.wait()
+        fn()
+    threads = [threading.Thread(target=run, args=(fn,)) for fn in fns]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+class ContendedGame:
+    def __init__(self, n, players, heats=1):
+        self.host = game_app.socketio.test_client(game_app.app)
+        self.host.emit('host_game', {})
+        created = received(self.host, 'game_created')[0]
+        self.code, self.token = created['game_code'], created['host_token']
+        self.host.emit('verify_host_token', {'game_code': self.code, 'host_token': self.token})
+        self.students = {}
+        self.tokens = {}
+        for i in range(players):
+            client = game_app.socketio.test_client(game_app.app)
+            client.emit('join_game', {'game_code': self.code, 'username': f'g{n}p{i}'})
+            self.students[f'g{n}p{i}'] = client
+            self.tokens[f'g{n}p{i}'] = received(client, 'join_success')[0]['resume_token']
+        self.host.emit('start_game')
+        self.host.emit('announce_in_game', {'game_code': self.code, 'host_token': self.token})
+        for username, client in self.students.items():
+            client.emit('announce_in_game', {'game_code': self.code, 'resume_token': self.tokens[username]})
+        self.question = game_app.QUESTION_BANKS.get('default').questions[0]
+        self.host.emit('teacher_selects_question', {'question_id': self.question.id, 'heats': heats})
+        for client in self.students.values():
+            client.get_received()
+        self.host.get_received()
+
+    def yield_in_tallies(self):
+        with game_app.games.lock(self.code):
+            game = game_app.games.get(self.code)
+            game.answer_counts = YieldingList(game.answer_counts)
+            game.vote_counts = YieldingDict(game.vote_counts)
+            game_app.save_game(self.code, game)
+
+    def answer(self, username):
+        # Even-numbered students answer correctly
+        correct = self.question.correct_answer_index
+        answer = correct if int(username.rsplit('p', 1)[1]) % 2 == 0 else (correct + 1) % len(self.question.options)
+        return lambda: self.students[username].emit('player_submit_answer', {'answer': answer})
+
+    def vote(self, username, contestant_sid):
+        return lambda: self.students[username].emit('player_submit_vote', {'contestant_sid': contestant_sid})
+
+    def check(self):
+        game = game_app.games.get(self.code)
+        audience = [p for p in game.players.values() if p.role == 'audience']
+        problems = []
+        if len(game.answers) != len(game.players):
+            problems.append(f'{self.code}: {len(game.answers)}/{len(game.players)} answers recorded')
+        if len(game.votes) != len(audience):
+            problems.append(f'{self.code}: {len(game.votes)}/{len(audience)} votes recorded')
+        answered = sum(1 for p in audience if p.id in game.answers)
+        if sum(game.answer_counts) != answered:
+            problems.append(f'{self.code}: answer tally {sum(game.answer_counts)}, {answered} audience answers')
+        if sum(game.vote_counts.values()) != len(game.votes):
+            problems.append(f'{self.code}: vote tally {sum(game.vote_counts.values())}, {len(game.votes)} votes')
+        correct = sum(1 for p in audience if game.answers.get(p.id) == self.question.correct_answer_index)
+        expected = 100 * correct + 300
+        total = sum(p.score for p in game.players.values())
+        if total != expected:
+            problems.append(f'{self.code}: scores total {total}, expected {expected}')
+        notices = len(received(self.host, 'all_submitted'))
+        if notices != 2:
+            problems.append(f'{self.code}: host told all_submitted {notices} times, expected 2')
+        return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--games', type=int, default=8)
+    parser.add_argument('--players', type=int, default=40)
+    parser.add_argument('--hosts', type=int, default=500, help='concurrent game code allocations')
+    parser.add_argument('--no-locks', action='store_true', help='disable the per-game locks')
+    parser.add_argument('--fakeredis', type=int, default=0, metavar='WORKERS',
+                        help='run on RedisGameStores sharing a fakeredis server, one per simulated worker')
+    args = parser.parse_args()
+
+    if args.fakeredis:
+        if fakeredis is None:
+            print("--fakeredis needs the fakeredis package: pip install 'fakeredis[lua]'")
+            return 1
+        game_app.games = WorkerStores(args.fakeredis)
+
+    if args.no_locks:
+        game_app.games.lock = lambda code: NO_LOCK
+
+    sims = [ContendedGame(n, args.players) for n in range(args.games)]
+    for sim in sims:
+        sim.yield_in_tallies()
+
+    started = time.perf_counter()
+    run_all([sim.answer(username) for sim in sims for username in sim.students])
+    for sim in sims:
+        sim.host.emit('end_phase')
+    votes = []
+    for sim in sims:
+        game = game_app.games.get(sim.code)
+        first = game.contestant_players()[0].sid
+        votes.extend(sim.vote(p.username, first) for p in game.players.values() if p.role == 'audience')
+    run_all(votes)
+    for sim in sims:
+        sim.host.emit('end_phase')
+    elapsed = time.perf_counter() - started
+
+    problems = [problem for sim in sims for problem in sim.check()]
+
+    before = len(game_app.games)
+    codes = []
+    hosts = [game_app.socketio.test_client(game_app.app) for _ in range(args.hosts)]
+
+    def host_game(client):
+        def run():
+            client.emit('host_game', {})
+            codes.append(received(client, 'game_created')[0]['game_code'])
+        return run
+    run_all([host_game(client) for client in hosts])
+    if len(set(codes)) != len(codes) or len(game_app.games) - before != len(codes):
+        problems.append(f'{len(codes)} hosts got {len(set(codes))} distinct codes, '
+                        f'{len(game_app.games) - before} games stored')
+
+    store = f'fakeredis x{args.fakeredis}' if args.fakeredis else type(game_app.games).__name__
+    print(f"games={args.games} players={args.players} submissions={len(votes) + args.games * args.players} "
+          f"seconds={elapsed:.2f} locks={'off' if args.no_locks else 'on'} store={store}")
+    for problem in problems:
+        print('  ' + problem)
+    print('OK' if not problems else f'{len(problems)} problems')
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
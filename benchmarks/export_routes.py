@@ -0,0 +1,89 @@
+"""Check the export routes under both entry points: Flask's own app, then asgi.application.
+
+    python benchmarks/export_routes.py
+
+One game with a recorded round is set up, then each mode requests /export and /host/<code>/export with
+no token, a wrong token, the host token in the old ?token= query, and the right `Authorization: Bearer`
+header, checking status codes and that the right rows come back. The ASGI requests are sent straight to
+the ASGI callable, as uvicorn would, after importing asgi.py swaps app.request for its socket stand-in.
+"""
+import asyncio
+import os
+import sys
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as game_app
+from models import Game
+
+EXPORT_TOKEN = 'export-check-token'
+
+
+def flask_get(path, headers):
+    response = game_app.app.test_client().get(path, headers=headers)
+    return response.status_code, response.get_data(as_text=True)
+
+
+def asgi_get(application, path, headers):
+    url = urlsplit(path)
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+        'path': url.path, 'raw_path': url.path.encode(), 'query_string': url.query.encode(), 'root_path': '',
+        'headers': [(name.lower().encode(), value.encode()) for name, value in headers.items()],
+        'client': ('127.0.0.1', 50000), 'server': ('testserver', 80),
+    }
+    status, body = [], []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+        elif message['type'] == 'http.response.body':
+            body.append(message.get('body', b''))
+    asyncio.run(application(scope, receive, send))
+    return status[0], b''.join(body).decode()
+
+
+def check(mode, get, code, host_token):
+    bearer = lambda token: {'Authorization': f'Bearer {token}'}
+    cases = [
+        ('/export', {}, 404, None),
+        ('/export', bearer('wrong'), 404, None),
+        ('/export?format=csv', bearer(EXPORT_TOKEN), 200, 'bank,question_id'),
+        ('/export?view=rounds', bearer(EXPORT_TOKEN), 200, f'"game_code":"{code}"'),
+        (f'/host/{code}/export', {}, 404, None),
+        (f'/host/{code}/export?format=csv&token={host_token}', {}, 404, None),
+        (f'/host/{code}/export', bearer('wrong'), 404, None),
+        (f'/host/{code}/export?format=csv', bearer(host_token), 200, f'1,1,{code},'),
+    ]
+    problems = []
+    for path, headers, expected, content in cases:
+        status, body = get(path, headers)
+        if status != expected or (content and content not in body):
+            problems.append(f'{mode}: GET {path} {sorted(headers)} -> {status}, expected {expected}'
+                            + (f' containing {content!r}' if content else ''))
+    return problems
+
+
+def main():
+    game_app.EXPORT_TOKEN = EXPORT_TOKEN
+    host_token = 'host-check-token'
+    game = Game('host', host_token)
+    code = game_app.games.allocate(game, game_app.game_codes.take)
+    game_app.answer_stats.add(code, host_token, 'default', 1, 0, [3, 1, 0, 0], 3, [1.5, 2.0, 4.0, 6.5])
+
+    problems = check('flask', flask_get, code, host_token)
+    import asgi  # rebinds app.request, app.socketio and app.emit, as running under uvicorn does
+    problems += check('asgi', lambda path, headers: asgi_get(asgi.application, path, headers), code, host_token)
+
+    for problem in problems:
+        print('  ' + problem)
+    print('OK' if not problems else f'{len(problems)} problems')
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
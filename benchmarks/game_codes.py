@@ -0,0 +1,75 @@
+"""Compare game code allocation latency at 10%, 90% and 99% occupancy: the old random retry loop vs CodeAllocator.
+
+    python benchmarks/game_codes.py --length 3
+"""
+import argparse
+import os
+import random
+import statistics
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game_codes import CodeAllocator
+
+
+def release(live, release_code, rng):
+    """Keep occupancy level by tearing down a random live game"""
+    i = rng.randrange(len(live))
+    live[i], live[-1] = live[-1], live[i]
+    release_code(live.pop())
+
+
+def random_code(length, rng):
+    return ''.join(rng.choices(string.ascii_uppercase + string.digits, k=length))
+
+
+def retry_loop(length, occupancy, samples, rng):
+    taken = set()
+    while len(taken) < int(36 ** length * occupancy):
+        taken.add(random_code(length, rng))
+    live = list(taken)
+    times = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        code = random_code(length, rng)
+        while code in taken:
+            code = random_code(length, rng)
+        times.append(time.perf_counter() - started)
+        taken.add(code)
+        release(live, taken.discard, rng)
+        live.append(code)
+    return times
+
+
+def allocator(length, occupancy, samples, rng):
+    codes = CodeAllocator(length, rng=rng)
+    live = [codes.take() for _ in range(int(codes.size * occupancy))]
+    times = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        code = codes.take()
+        times.append(time.perf_counter() - started)
+        release(live, codes.release, rng)
+        live.append(code)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--length', type=int, default=3)
+    parser.add_argument('--samples', type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{'method':>10} {'occupancy':>9} {'median us':>10} {'p99 us':>8} {'max us':>8}")
+    for name, fn in [('retry', retry_loop), ('allocator', allocator)]:
+        for occupancy in (0.10, 0.90, 0.99):
+            times = sorted(fn(args.length, occupancy, args.samples, random.Random(1)))
+            print(f"{name:>10} {occupancy:>9.0%} {statistics.median(times) * 1e6:>10.2f} "
+                  f"{times[int(len(times) * 0.99)] * 1e6:>8.2f} {times[-1] * 1e6:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Check parallel heats end to end and estimate how long a class takes to give everyone a turn.
+
+    python benchmarks/heats.py --players 120 --heats 15
+
+First one round is played through the socket handlers with --heats heats. Every student must be told only its
+own heat's pair, vote inside its heat, and each heat's winner must get the 300 points. Then the rotation queue
+is run on its own to count questions, and minutes at ANSWER + VOTE + RESULTS seconds each, until every
+student has been a contestant, for one heat against --heats.
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as game_app
+from contention import ContendedGame, received, run_all
+from recovery import make_game
+
+
+def play_heat_round(players, heats):
+    sim = ContendedGame(0, players, heats)
+    game = game_app.games.get(sim.code)
+    problems = []
+    if len(game.heats) != heats:
+        problems.append(f'{len(game.heats)} heats started, asked for {heats}')
+    run_all([sim.answer(username) for username in sim.students])
+    sim.host.emit('end_phase')
+
+    votes = []
+    for username, client in sim.students.items():
+        player = next(p for p in game.players.values() if p.username == username)
+        offered = [data['answers'] for data in received(client, 'phase_change') if data['phase'] == 'voting']
+        pair = {p.sid for p in game.heat_players(player.heat)}
+        if not offered or set(offered[0]) != pair:
+            problems.append(f'{username} was offered {sorted(offered[0]) if offered else None}, not its heat')
+        elif player.role == 'audience':
+            votes.append(sim.vote(username, sorted(pair)[0]))
+    run_all(votes)
+    sim.host.emit('end_phase')
+
+    audience = [p for p in game.players.values() if p.role == 'audience']
+    correct = sum(1 for p in audience if game.answers.get(p.id) == sim.question.correct_answer_index)
+    total = sum(p.score for p in game.players.values())
+    if total != 100 * correct + 300 * len(game.heats):
+        problems.append(f'scores total {total}, expected {100 * correct + 300 * len(game.heats)}')
+    return problems
+
+
+def questions_for_full_rotation(players, heats):
+    game = make_game(players)
+    questions = 0
+    while True:
+        game.start_round(None, heats)
+        questions += 1
+        if not game.rotation or game.round_number > 1:
+            # The queue ran dry (or refilled partway through this question): everyone has had a turn
+            return questions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--players', type=int, default=120)
+    parser.add_argument('--heats', type=int, default=15)
+    args = parser.parse_args()
+
+    problems = play_heat_round(args.players, args.heats)
+    for problem in problems:
+        print('  ' + problem)
+    print('heat round OK' if not problems else f'{len(problems)} problems')
+
+    per_question = (game_app.ANSWER_SECONDS + game_app.VOTE_SECONDS + game_app.RESULTS_SECONDS) / 60
+    for heats in sorted({1, args.heats}):
+        questions = questions_for_full_rotation(args.players, heats)
+        print(f"players={args.players} heats={heats:>3}: {questions:>3} questions, "
+              f"~{questions * per_question:.0f} min of rounds for everyone to have a turn")
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
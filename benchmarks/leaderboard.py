@@ -0,0 +1,82 @@
+"""Time per-round score updates, top 10 and ranks for a large game: sorting every player vs the bucketed Leaderboard.
+
+    python benchmarks/leaderboard.py --players 1000 --rounds 30
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from leaderboard import Leaderboard
+
+
+def sorted_standings(scores):
+    ordered = sorted(scores.items(), key=lambda item: -item[1])
+    ranks, rank = {}, 0
+    for n, (pid, score) in enumerate(ordered):
+        if n == 0 or score != ordered[n - 1][1]:
+            rank = n + 1
+        ranks[pid] = rank
+    best = ordered[0][1]
+    return ordered[:10], ranks, [pid for pid, score in ordered if score == best]
+
+
+def bucketed_standings(board):
+    return board.top(10), board.ranks(), board.leaders()
+
+
+def awards(players, rng):
+    """One round: about half the audience answer right, and one or two contestants split 300"""
+    correct = [(pid, 100) for pid in range(players) if rng.random() < 0.5]
+    winners = rng.sample(range(players), rng.choice([1, 2]))
+    return correct + [(pid, 300 // len(winners)) for pid in winners]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--players', type=int, default=1000)
+    parser.add_argument('--rounds', type=int, default=30)
+    args = parser.parse_args()
+
+    rounds = [awards(args.players, random.Random(n)) for n in range(args.rounds)]
+
+    scores = dict.fromkeys(range(args.players), 0)
+    sorting = [0.0, 0.0]  # seconds awarding, seconds querying
+    for round_awards in rounds:
+        started = time.perf_counter()
+        for pid, points in round_awards:
+            scores[pid] += points
+        awarded = time.perf_counter()
+        sorted_top, sorted_ranks, sorted_leaders = sorted_standings(scores)
+        sorting[0] += awarded - started
+        sorting[1] += time.perf_counter() - awarded
+
+    board = Leaderboard()
+    for pid in range(args.players):
+        board.set(pid, 0)
+    totals = dict.fromkeys(range(args.players), 0)
+    bucketed = [0.0, 0.0]
+    for round_awards in rounds:
+        started = time.perf_counter()
+        for pid, points in round_awards:
+            totals[pid] += points
+            board.set(pid, totals[pid])
+        awarded = time.perf_counter()
+        top, ranks, (best, leaders) = bucketed_standings(board)
+        bucketed[0] += awarded - started
+        bucketed[1] += time.perf_counter() - awarded
+
+    rank_of_score = dict(ranks)
+    assert all(rank_of_score[scores[pid]] == sorted_ranks[pid] for pid in scores)
+    assert sorted(leaders) == sorted(sorted_leaders) and [s for _, s in top] == [s for _, s in sorted_top]
+    print(f"players={args.players} rounds={args.rounds} distinct_scores={len(ranks)}")
+    print(f"{'':>18} {'award ms':>9} {'standings ms':>13}  (per round; standings = top 10 + ranks + leaders)")
+    for name, (award, query) in [('sort every round', sorting), ('leaderboard', bucketed)]:
+        print(f"{name:>18} {award / args.rounds * 1e3:>9.3f} {query / args.rounds * 1e3:>13.4f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,325 @@
+"""Drive full games against a running server with headless Socket.IO clients and report JSON results.
+
+    python benchmarks/loadtest.py --spawn --games 10 --players 30 --rounds 3 --output results.json
+
+Each game gets a host and N students on their own python-socketio clients (pip install
+"python-socketio[client]"; psutil is optional and adds server CPU/RSS). With --spawn the app is
+started locally (--server flask or asgi) with TIME_SCALE so round timers are compressed; otherwise
+point --url at a server.
+Latency is measured from an emit to the reply event it triggers.
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+
+import socketio
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)  # reply event -> seconds
+        self.received = 0
+        self.errors = []
+
+    def latency(self, event, seconds):
+        with self.lock:
+            self.latencies[event].append(seconds)
+
+    def count(self):
+        with self.lock:
+            self.received += 1
+
+    def error(self, who, message):
+        with self.lock:
+            self.errors.append(f'{who}: {message}')
+
+    def summary(self):
+        with self.lock:
+            return {
+                event: {'count': len(xs), 'p50_ms': percentile(xs, 50) * 1e3, 'p99_ms': percentile(xs, 99) * 1e3}
+                for event, xs in sorted(self.latencies.items())
+            }
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else 0.0
+
+
+class SimClient:
+    """One socket; send() notes when a reply is expected so its arrival can be timed"""
+
+    def __init__(self, url, name, recorder):
+        self.name = name
+        self.recorder = recorder
+        self.sio = socketio.Client(reconnection=False)
+        self.pending = defaultdict(list)  # reply event -> send times
+        self.lock = threading.Lock()
+        self.handlers = {}
+        self.sio.on('*', self._dispatch)
+        self.sio.connect(url, transports=['websocket'], wait_timeout=30)
+
+    @property
+    def sid(self):
+        return self.sio.get_sid()
+
+    def on(self, event, handler):
+        self.handlers[event] = handler
+
+    def send(self, event, data=None, reply=None):
+        if reply:
+            with self.lock:
+                self.pending[reply].append(time.perf_counter())
+        if data is None:
+            self.sio.emit(event)
+        else:
+            self.sio.emit(event, data)
+
+    def _dispatch(self, event, *args):
+        now = time.perf_counter()
+        self.recorder.count()
+        with self.lock:
+            sent = self.pending[event].pop(0) if self.pending.get(event) else None
+        if sent is not None:
+            self.recorder.latency(event, now - sent)
+        if event == 'error':
+            self.recorder.error(self.name, ((args[0] if args else None) or {}).get('message'))
+        handler = self.handlers.get(event)
+        if handler:
+            handler(*args)
+
+    def close(self):
+        try:
+            self.sio.disconnect()
+        except Exception:
+            pass
+
+
+class SimGame:
+    def __init__(self, url, index, players, rounds, chat_rate, recorder):
+        self.url = url
+        self.index = index
+        self.players = players
+        self.rounds = rounds
+        self.chat_rate = chat_rate
+        self.recorder = recorder
+        self.rng = random.Random(index)
+        self.done = threading.Event()
+        self.rounds_played = 0
+        self.finished = None
+
+    def run(self, timeout):
+        host = SimClient(self.url, f'game{self.index}/host', self.recorder)
+        students = []
+        try:
+            created = wait_for(host, 'game_created', lambda: host.send('host_game', {}, reply='game_created'))
+            code, token = created['game_code'], created['host_token']
+            wait_for(host, 'host_verified',
+                     lambda: host.send('verify_host_token', {'game_code': code, 'host_token': token}, reply='host_verified'))
+
+            for n in range(self.players):
+                student = SimClient(self.url, f'game{self.index}/student{n}', self.recorder)
+                students.append(student)
+                username = f'g{self.index}s{n}'
+                joined = wait_for(student, 'join_success',
+                                  lambda: student.send('join_game', {'game_code': code, 'username': username}, reply='join_success'))
+                student.username = username
+                student.resume_token = joined['resume_token']
+
+            host.send('start_game')
+            for student in students:
+                self._play_student(student, code)
+            for student in students:
+                wait_for(student, 'identity_confirmed', lambda s=student: s.send(
+                    'announce_in_game', {'game_code': code, 'resume_token': s.resume_token}, reply='identity_confirmed'))
+
+            self._play_host(host, code, token)
+            if not self.done.wait(timeout):
+                self.recorder.error(f'game{self.index}', 'timed out')
+        except Exception as e:
+            self.recorder.error(f'game{self.index}', repr(e))
+        finally:
+            # Socket teardown is left out of the timings; students go first so nobody sees the host leave
+            self.finished = time.perf_counter()
+            for client in [*students, host]:
+                client.close()
+
+    def _play_host(self, host, code, token):
+        state = {}
+
+        def next_round(*_):
+            if self.rounds_played >= self.rounds or not state['questions']:
+                self.done.set()
+                return
+            self.rounds_played += 1
+            host.send('teacher_selects_question', {'question_id': state['questions'].pop(0)}, reply='new_round_started')
+
+        def confirmed(data):
+            questions = json.loads(data.get('questions_json') or '[]')
+            used = set(data.get('used_question_ids') or [])
+            state['questions'] = [q['id'] for q in questions if q['id'] not in used]
+            next_round()
+
+        host.on('identity_confirmed', confirmed)
+        host.on('all_submitted', lambda data: host.send('end_phase'))
+        host.on('prepare_for_next_round', next_round)
+        host.on('game_over', lambda data: self.done.set())
+        host.send('announce_in_game', {'game_code': code, 'host_token': token}, reply='identity_confirmed')
+
+    def _play_student(self, student, code):
+        def round_started(data):
+            is_contestant = any(p['sid'] == student.sid for p in data['contestants'])
+            answer = f'answer from {student.username}' if is_contestant else self.rng.randrange(len(data['options']))
+            student.send('player_submit_answer', {'answer': answer}, reply='answer_received')
+            if self.rng.random() < self.chat_rate:
+                student.send('send_message', {'message': f'hi from {student.username}'}, reply='new_messages')
+
+        def phase_changed(data):
+            if data.get('phase') == 'voting' and student.sid not in data['answers']:
+                student.send('player_submit_vote', {'contestant_sid': self.rng.choice(list(data['answers']))},
+                             reply='vote_received')
+
+        student.on('new_round_started', round_started)
+        student.on('phase_change', phase_changed)
+
+
+def wait_for(client, event, send, timeout=30):
+    """Send and block until `event` arrives on `client`; returns its payload"""
+    arrived = threading.Event()
+    box = []
+    previous = client.handlers.get(event)
+
+    def handler(*args):
+        box.append(args[0] if args else None)
+        arrived.set()
+
+    client.on(event, handler)
+    send()
+    try:
+        if not arrived.wait(timeout):
+            raise TimeoutError(f'{client.name} waited {timeout}s for {event}')
+        return box[0]
+    finally:
+        if previous:
+            client.on(event, previous)
+        else:
+            client.handlers.pop(event, None)
+
+
+class ServerSampler:
+    """Samples CPU seconds and RSS of the server process when psutil is installed"""
+
+    def __init__(self, pid):
+        try:
+            import psutil
+            self.process = psutil.Process(pid) if pid else None
+        except ImportError:
+            self.process = None
+        self.peak_rss = 0
+        self.stopped = threading.Event()
+        if self.process:
+            self.cpu_start = sum(self.process.cpu_times()[:2])
+            threading.Thread(target=self._sample, daemon=True).start()
+
+    def _sample(self):
+        while not self.stopped.wait(0.25):
+            self.peak_rss = max(self.peak_rss, self.process.memory_info().rss)
+
+    def stop(self, elapsed):
+        self.stopped.set()
+        if not self.process:
+            return {'cpu_percent': None, 'peak_rss_mb': None}
+        cpu = sum(self.process.cpu_times()[:2]) - self.cpu_start
+        self.peak_rss = max(self.peak_rss, self.process.memory_info().rss)
+        return {'cpu_percent': 100 * cpu / elapsed, 'peak_rss_mb': self.peak_rss / 2 ** 20}
+
+
+SERVER_COMMANDS = {
+    'flask': ['-c', "import app; app.socketio.run(app.app, host='127.0.0.1', port={port}, allow_unsafe_werkzeug=True)"],
+    'asgi': ['-m', 'uvicorn', 'asgi:application', '--host', '127.0.0.1', '--port', '{port}', '--log-level', 'warning'],
+}
+
+
+def spawn_server(mode, port, time_scale):
+    env = dict(os.environ, TIME_SCALE=str(time_scale), FLASK_SECRET_KEY=os.environ.get('FLASK_SECRET_KEY', 'loadtest'))
+    command = [arg.format(port=port) for arg in SERVER_COMMANDS[mode]]
+    server = subprocess.Popen([sys.executable, *command], cwd=ROOT, env=env)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return server
+        except OSError:
+            if server.poll() is not None:
+                raise RuntimeError('server exited during startup')
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError('server did not start listening')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:5055')
+    parser.add_argument('--spawn', action='store_true', help='start the server locally on the --url port')
+    parser.add_argument('--server', choices=sorted(SERVER_COMMANDS), default='flask',
+                        help='with --spawn: Flask-SocketIO (app.py) or the asyncio server (asgi.py)')
+    parser.add_argument('--time-scale', type=float, default=0.05, help='TIME_SCALE for a spawned server')
+    parser.add_argument('--server-pid', type=int, help='pid to sample for CPU/RSS when not spawning')
+    parser.add_argument('--games', type=int, default=5)
+    parser.add_argument('--players', type=int, default=20)
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--chat-rate', type=float, default=0.3, help='chance a student chats each round')
+    parser.add_argument('--timeout', type=float, default=300)
+    parser.add_argument('--output', help='write the JSON results here as well as stdout')
+    args = parser.parse_args()
+
+    server = spawn_server(args.server, int(args.url.rsplit(':', 1)[1].strip('/')), args.time_scale) if args.spawn else None
+    recorder = Recorder()
+    sampler = ServerSampler(server.pid if server else args.server_pid)
+    sims = [SimGame(args.url, n, args.players, args.rounds, args.chat_rate, recorder) for n in range(args.games)]
+    threads = [threading.Thread(target=sim.run, args=(args.timeout,)) for sim in sims]
+
+    started = time.perf_counter()
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        elapsed = max([sim.finished for sim in sims if sim.finished] or [time.perf_counter()]) - started
+        server_stats = sampler.stop(elapsed)
+        if server:
+            server.terminate()
+            server.wait(10)
+
+    results = {
+        'config': vars(args),
+        'elapsed_s': elapsed,
+        'games_completed': sum(sim.done.is_set() for sim in sims),
+        'rounds_played': sum(sim.rounds_played for sim in sims),
+        'events_received': recorder.received,
+        'events_per_s': recorder.received / elapsed,
+        'latency': recorder.summary(),
+        'server': server_stats,
+        'errors': recorder.errors[:50],
+        'error_count': len(recorder.errors),
+    }
+    text = json.dumps(results, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+
+
+if __name__ == '__main__':
+    main()
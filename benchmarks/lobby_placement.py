@@ -0,0 +1,61 @@
+"""Join 1,000 players into one lobby and time where CirclePlacer puts them.
+
+    python benchmarks/lobby_placement.py --players 1000
+
+Run twice: cold, with the shared Poisson-disk levels sampled by whichever join first needs them, and
+prepared, with CirclePlacer.prepare() run first as app.startup() does. Reported per run: total and
+slowest join (and which join it was), the closest two circles once 25, 100 and --players have joined,
+and the pickled size of the placer and of the whole Game, which every save of a shared store writes.
+"""
+import argparse
+import math
+import os
+import pickle
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import Game
+from placement import CirclePlacer
+
+
+def min_spacing(positions):
+    return min(math.dist(a, b)
+               for i, a in enumerate(positions) for b in positions[i + 1:])
+
+
+def join_all(players):
+    game = Game('host', 'token')
+    times = []
+    for i in range(players):
+        start = time.perf_counter()
+        game.add_player(f'sid{i}', f'user{i}', '#FF6B6B')
+        times.append(time.perf_counter() - start)
+    return game, times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--players', type=int, default=1000)
+    args = parser.parse_args()
+
+    for label in ('cold', 'prepared'):
+        CirclePlacer._levels.clear()
+        prepared = 0
+        if label == 'prepared':
+            start = time.perf_counter()
+            slots = CirclePlacer().prepare()
+            prepared = time.perf_counter() - start
+        game, times = join_all(args.players)
+        slowest = max(range(len(times)), key=times.__getitem__)
+        positions = [p.position for p in game.players.values()]
+        spacing = ' '.join(f'{n}:{min_spacing(positions[:n]):.1f}' for n in (25, 100, args.players) if n <= len(positions))
+        print(f'{label:>8}: joins {sum(times) * 1000:7.2f} ms, slowest {times[slowest] * 1000:7.2f} ms (join {slowest + 1})'
+              + (f', prepare {prepared * 1000:.0f} ms for {slots} slots' if prepared else ''))
+        print(f'{"":>8}  min spacing {spacing}; pickled placer {len(pickle.dumps(game.placer))} bytes, '
+              f'game {len(pickle.dumps(game))} bytes')
+
+
+if __name__ == '__main__':
+    main()
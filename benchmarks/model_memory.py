@@ -0,0 +1,117 @@
+"""Compare per-game memory and reconnect cost of the old nested-dict layout against models.Game.
+
+    python benchmarks/model_memory.py --players 1000 --games 10
+"""
+import argparse
+import collections
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import Game
+from placement import CirclePlacer
+
+
+def dict_game(players):
+    """The layout games used before models.Game: five sid-keyed containers with copied player records"""
+    placer = CirclePlacer()
+    game = {
+        'players': {}, 'player_scores': {}, 'player_positions': {}, 'usernames': {},
+        'current_contestants': {}, 'current_audience': {}, 'current_answers': {}, 'current_votes': {},
+        'contestants_this_round': [], 'disconnected_players': {}, 'placer': placer,
+    }
+    for i in range(players):
+        sid, username = f'sid{i:05d}', f'user{i}'
+        top, left = placer.place()
+        position = {'top': top, 'left': left}
+        game['players'][sid] = {'username': username, 'color': '#FF6B6B', 'sid': sid, 'position': position}
+        game['player_scores'][sid] = 0
+        game['player_positions'][sid] = position
+        game['usernames'][username] = sid
+    sids = list(game['players'])
+    game['contestants_this_round'] = sids[:players // 2]
+    game['current_contestants'] = {sid: game['players'][sid] for sid in sids[:2]}
+    game['current_audience'] = {sid: dict(game['players'][sid]) for sid in sids[2:]}
+    game['current_answers'] = {sid: 1 for sid in sids}
+    return game
+
+
+def dict_reconnect(game, username, new_sid):
+    old_sid = game['usernames'][username]
+    game['players'][new_sid] = game['players'].pop(old_sid)
+    game['player_scores'][new_sid] = game['player_scores'].pop(old_sid)
+    game['player_positions'][new_sid] = game['player_positions'].pop(old_sid)
+    for container in ('current_contestants', 'current_audience', 'current_answers', 'current_votes'):
+        if old_sid in game[container]:
+            game[container][new_sid] = game[container].pop(old_sid)
+    if old_sid in game['contestants_this_round']:
+        game['contestants_this_round'][game['contestants_this_round'].index(old_sid)] = new_sid
+    game['usernames'][username] = new_sid
+    game['players'][new_sid]['sid'] = new_sid
+
+
+def model_game(players):
+    game = Game('host', 'token')
+    for i in range(players):
+        player = game.add_player(f'sid{i:05d}', f'user{i}', '#FF6B6B')
+        player.role, player.heat = ('contestant' if i < 2 else 'audience'), 0
+    pids = list(game.players)
+    # Half the class has had its turn: the rest wait in the rotation queue
+    game.rotation = collections.deque(pids[players // 2:])
+    game.heats = [pids[:2]]
+    game.contestants = pids[:2]
+    game.answers = dict.fromkeys(pids, 1)
+    game.state = 'answering'  # mid-round; a lobby also holds its cached roster (see Game.roster)
+    game.roster()
+    return game
+
+
+def dict_keys(game):
+    return list(game['usernames'])
+
+
+def model_reconnect(game, token, new_sid):
+    game.rebind(game.resume(token), new_sid)
+
+
+def model_keys(game):
+    return [game.resume_token(p) for p in game.players.values()]
+
+
+def measure(build, keys, reconnect, players, games):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    built = [build(players) for _ in range(games)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    # The shared placement levels were sampled before the snapshot, so everything here is the games' own
+    size = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+
+    # Whatever a returning client presents: a username for the dicts, a resume token for Game
+    presented = [keys(game) for game in built]
+    started = time.perf_counter()
+    for game, game_keys in zip(built, presented):
+        for n, key in enumerate(game_keys):
+            reconnect(game, key, f'new{n:05d}')
+    per_reconnect = (time.perf_counter() - started) / (games * players)
+    return size / games, per_reconnect
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--players', type=int, default=1000)
+    parser.add_argument('--games', type=int, default=10)
+    args = parser.parse_args()
+
+    CirclePlacer().prepare()  # sample the shared Poisson-disk levels outside the measurement
+    for name, build, keys, reconnect in [('dict', dict_game, dict_keys, dict_reconnect),
+                                         ('models.Game', model_game, model_keys, model_reconnect)]:
+        per_game, per_reconnect = measure(build, keys, reconnect, args.players, args.games)
+        print(f"{name:>12}: {per_game / 1024:8.1f} KiB/game  {per_reconnect * 1e6:7.2f} us/reconnect")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Time a reconnect storm: every student in a running round drops and announces again at once with their resume token.
+
+    python benchmarks/reconnect_storm.py --players 300
+
+Models a classroom Wi-Fi blip. Each student's new socket presents its resume token from its own thread,
+all released together. Afterwards every player must be back on their new sid with role, answer and
+score intact and the roster the same size.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as game_app
+from contention import ContendedGame, received, run_all
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--players', type=int, default=300)
+    args = parser.parse_args()
+
+    sim = ContendedGame(0, args.players)
+    run_all([sim.answer(username) for username in sim.students])
+    game = game_app.games.get(sim.code)
+    before = {p.id: (p.role, game.answers.get(p.id), p.score) for p in game.players.values()}
+
+    for client in sim.students.values():
+        client.disconnect()
+    fresh = {username: game_app.socketio.test_client(game_app.app) for username in sim.students}
+    latencies = []
+    lock = threading.Lock()
+
+    def announce(username):
+        def run():
+            started = time.perf_counter()
+            fresh[username].emit('announce_in_game', {'game_code': sim.code, 'resume_token': sim.tokens[username]})
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+        return run
+
+    started = time.perf_counter()
+    run_all([announce(username) for username in sim.students])
+    total = time.perf_counter() - started
+
+    problems = []
+    for username, client in fresh.items():
+        confirmed = received(client, 'identity_confirmed')
+        if not confirmed or confirmed[0]['username'] != username:
+            problems.append(f'{username}: no identity_confirmed')
+    after = {p.id: (p.role, game.answers.get(p.id), p.score) for p in game.players.values()}
+    if after != before:
+        problems.append('player state changed across the reconnect')
+    if len(game.by_sid) != args.players or any(p.sid is None for p in game.players.values()):
+        problems.append(f'{len(game.by_sid)}/{args.players} players bound to a socket')
+
+    latencies.sort()
+    print(f"players={args.players} storm_s={total:.3f} "
+          f"p50_ms={latencies[len(latencies) // 2] * 1e3:.2f} p99_ms={latencies[int(len(latencies) * 0.99)] * 1e3:.2f}")
+    for problem in problems:
+        print('  ' + problem)
+    print('OK' if not problems else f'{len(problems)} problems')
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
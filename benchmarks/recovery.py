@@ -0,0 +1,71 @@
+"""Time how long GameJournal takes to rebuild a server's worth of games.
+
+    python benchmarks/recovery.py --games 500 --players 30
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game_journal import GameJournal
+from models import Game
+
+
+def make_game(players):
+    game = Game('host', 'token')
+    game.host_verified = True
+    for i in range(players):
+        game.add_player(f'sid{i:04d}', f'user{i}', '#FF6B6B')
+    game.roster_seq = players
+    return game
+
+
+def play_rounds(journal, code, game, rounds):
+    for question_id in range(1, rounds + 1):
+        game.questions_used.add(question_id)
+        journal.append(code, 'round', {'questions_used': game.questions_used, 'answers': {}})
+        for pid in game.players:
+            journal.append(code, 'answer', {('answers', pid): question_id % 4})
+        for player in game.players.values():
+            player.score += 100
+        journal.append(code, 'scores', {'players': game.players})
+        journal.append(code, 'phase', {'state': 'intermission', 'phase_id': question_id * 3})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--games', type=int, default=500)
+    parser.add_argument('--players', type=int, default=30)
+    parser.add_argument('--rounds', type=int, default=5, help='rounds journaled after each snapshot')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='journal-bench-')
+    try:
+        journal = GameJournal(directory, snapshot_every=10 ** 9)
+        started = time.perf_counter()
+        for n in range(args.games):
+            code = f'G{n:04d}'
+            game = make_game(args.players)
+            journal.snapshot(code, game)
+            play_rounds(journal, code, game, args.rounds)
+        journal.close()
+        written = time.perf_counter() - started
+
+        started = time.perf_counter()
+        recovered = dict(GameJournal(directory).recover())
+        elapsed = time.perf_counter() - started
+
+        size = sum(os.path.getsize(os.path.join(directory, f)) for f in os.listdir(directory))
+        print(f"wrote {args.games} games in {written:.2f}s ({size / 1e6:.1f} MB on disk)")
+        print(f"recovered {len(recovered)} games in {elapsed:.3f}s "
+              f"({elapsed / max(len(recovered), 1) * 1e3:.2f} ms/game)")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
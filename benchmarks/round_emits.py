@@ -0,0 +1,65 @@
+"""Count the Socket.IO emits one round costs, to show they no longer grow with the number of players.
+
+    python benchmarks/round_emits.py --players 50 100 200
+
+Every emit reaching socketio.server.emit is recorded while a game of each size plays one round through
+the handlers: question chosen, everyone answers, the audience votes, results and scores. Lobby traffic
+(joins, roster deltas, the move to the game page) is left out. The answer_received and vote_received
+acks go back to the sender of each submission, so they are counted apart from the round's fan-out.
+"""
+import argparse
+import collections
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as game_app
+from contention import ContendedGame
+
+ROUND_EVENTS = {'question_selected', 'new_round_started', 'phase_change', 'all_submitted', 'live_tally',
+                'show_results', 'update_scores'}
+ACKS = {'answer_received', 'vote_received'}
+
+
+def play_round(players):
+    emitted = collections.Counter()
+    server = game_app.socketio.server
+    emit = server.emit
+
+    def counting_emit(event, *args, **kwargs):
+        emitted[event] += 1
+        return emit(event, *args, **kwargs)
+    server.emit = counting_emit
+    try:
+        sim = ContendedGame(0, players)
+        for username in sim.students:
+            sim.answer(username)()
+        sim.host.emit('end_phase')
+        game = game_app.games.get(sim.code)
+        first = game.contestant_players()[0].sid
+        for player in game.players.values():
+            if player.role == 'audience':
+                sim.vote(player.username, first)()
+        sim.host.emit('end_phase')
+    finally:
+        server.emit = emit
+    return emitted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--players', type=int, nargs='+', default=[50, 100, 200])
+    args = parser.parse_args()
+
+    print(f"{'players':>8} {'round emits':>12} {'acks':>6}  by event")
+    for players in args.players:
+        emitted = play_round(players)
+        fan_out = {event: n for event, n in emitted.items() if event in ROUND_EVENTS}
+        acks = sum(n for event, n in emitted.items() if event in ACKS)
+        detail = ' '.join(f'{event}={n}' for event, n in sorted(fan_out.items()))
+        print(f'{players:8d} {sum(fan_out.values()):12d} {acks:6d}  {detail}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""Show that finding a sid's game, and the answer handler built on it, stay flat as the server holds more games.
+
+    python benchmarks/sid_lookup.py --games 10 100 1000 --players 30
+
+For each game count the server is filled with idle games of --players students, indexed the way join_game
+indexes them. One real game is played through the socket handlers alongside them. Reported per count:
+the old scan over every game's players for a sid that has gone, get_game_code_for_sid, and the median
+player_submit_answer round trip through the Socket.IO test client for a student of the real game.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as game_app
+from contention import ContendedGame
+from models import Game
+
+
+def scan(sid):
+    """The lookup get_game_code_for_sid replaced: check every game's players"""
+    for code, game in game_app.games.items():
+        if sid in game.by_sid:
+            return code
+    return None
+
+
+def add_idle_games(count, players, start):
+    for n in range(start, start + count):
+        game = Game(f'host{n}', f'token{n}')
+        code = game_app.game_codes.take()
+        for i in range(players):
+            sid = f'idle{n}-{i}'
+            game.add_player(sid, f'user{i}', '#FF6B6B')
+            game_app.index_sid(sid, code, 'player')
+        game_app.games.add(code, game)
+
+
+def per_call(fn, arg, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(arg)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--games', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--players', type=int, default=30)
+    parser.add_argument('--answers', type=int, default=300, help='timed answer submissions per game count')
+    args = parser.parse_args()
+
+    sim = ContendedGame(0, args.players)
+    username, client = next(iter(sim.students.items()))
+    game = game_app.games.get(sim.code)
+    sid = next(p.sid for p in game.players.values() if p.username == username)
+
+    print(f"{'games':>6} {'scan us':>9} {'index us':>9} {'answer handler ms':>18}")
+    held = 1
+    for count in sorted(args.games):
+        add_idle_games(count - held, args.players, held)
+        held = count
+        # A sid no game holds makes the scan visit everything, the worst case it had
+        scan_us = per_call(scan, 'gone', 20) * 1e6
+        index_us = per_call(game_app.get_game_code_for_sid, sid, 10000) * 1e6
+        times = []
+        for n in range(args.answers):
+            start = time.perf_counter()
+            client.emit('player_submit_answer', {'answer': n % 4})
+            times.append(time.perf_counter() - start)
+            client.get_received()
+        print(f'{count:6d} {scan_us:9.2f} {index_us:9.2f} {statistics.median(times) * 1000:18.3f}')
+
+
+if __name__ == '__main__':
+    main()
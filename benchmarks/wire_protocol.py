@@ -0,0 +1,137 @@
+"""Compare bytes and encode/decode CPU of the JSON and MessagePack wire protocols on one game's traffic.
+
+    python benchmarks/wire_protocol.py --players 200 --heats 5
+
+A game is played through the socket handlers: every student joins, moves to the game page, answers, votes
+and chats through one round, and every packet each client receives is kept. That traffic is then encoded
+and decoded with python-socketio's own packet classes, once as the default JSON protocol sends it today and
+once with players and leaderboard rows packed as arrays (what SOCKETIO_SERIALIZER=msgpack turns on),
+in JSON and, when the msgpack package is installed, in MessagePack.
+"""
+import argparse
+import collections
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from socketio import packet
+
+import app as game_app
+from models import Player
+
+try:
+    from socketio.msgpack_packet import MsgPackPacket
+except ImportError:  # msgpack is optional; without it only the JSON rows are measured
+    MsgPackPacket = None
+
+
+def play(players, heats):
+    """One round of a `players` game; returns every (event, args) a client received, once per recipient"""
+    host = game_app.socketio.test_client(game_app.app)
+    clients = [host]
+    traffic = []
+
+    def collect():
+        for client in clients:
+            traffic.extend((p['name'], p['args']) for p in client.get_received())
+
+    host.emit('host_game', {})
+    collect()
+    created = next(args[0] for name, args in traffic if name == 'game_created')
+    code, token = created['game_code'], created['host_token']
+    host.emit('verify_host_token', {'game_code': code, 'host_token': token})
+    students = []
+    for i in range(players):
+        client = game_app.socketio.test_client(game_app.app)
+        client.emit('join_game', {'game_code': code, 'username': f'wire{i}'})
+        received = client.get_received()
+        traffic.extend((p['name'], p['args']) for p in received)
+        students.append((client, next(p['args'][0]['resume_token'] for p in received if p['name'] == 'join_success')))
+        clients.append(client)
+    host.emit('start_game')
+    collect()
+
+    # Everyone arrives on the game page as a new socket
+    clients = [game_app.socketio.test_client(game_app.app)]
+    clients[0].emit('announce_in_game', {'game_code': code, 'host_token': token})
+    for old, resume_token in students:
+        old.disconnect()
+        client = game_app.socketio.test_client(game_app.app)
+        client.emit('announce_in_game', {'game_code': code, 'resume_token': resume_token})
+        clients.append(client)
+    host = clients[0]
+    question = game_app.QUESTION_BANKS.get('default').questions[0]
+    host.emit('teacher_selects_question', {'question_id': question.id, 'heats': heats})
+    game = game_app.games.get(code)
+    for n, client in enumerate(clients[1:]):
+        client.emit('player_submit_answer', {'answer': n % len(question.options)})
+        if n % 5 == 0:
+            client.emit('send_message', {'message': f'message from student {n}'})
+    time.sleep(2 * max(game_app.CHAT_BATCH_SECONDS, game_app.LIVE_TALLY_SECONDS))
+    host.emit('end_phase')
+    by_username = {p.username: p for p in game.players.values()}
+    for n, client in enumerate(clients[1:]):
+        player = by_username[f'wire{n}']
+        if player.role == 'audience':
+            client.emit('player_submit_vote', {'contestant_sid': game.heat_players(player.heat)[0].sid})
+    time.sleep(2 * game_app.LIVE_TALLY_SECONDS)
+    host.emit('end_phase')
+    collect()
+    return traffic
+
+
+def measure(traffic, packet_class, repeat):
+    """(bytes, encode seconds, decode seconds) for `traffic` through `packet_class`"""
+    packets = [packet_class(packet.EVENT, data=[name, *args], namespace='/') for name, args in traffic]
+    encoded = [p.encode() for p in packets]
+    size = sum(len(e.encode() if isinstance(e, str) else e) for e in encoded)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for p in packets:
+            p.encode()
+    encode = (time.perf_counter() - start) / repeat
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for e in encoded:
+            packet_class(encoded_packet=e)
+    decode = (time.perf_counter() - start) / repeat
+    return size, encode, decode
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--players', type=int, default=200)
+    parser.add_argument('--heats', type=int, default=5)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    Player.compact = False
+    plain = play(args.players, args.heats)
+    Player.compact = True
+    rows = play(args.players, args.heats)
+
+    modes = [('json', plain, packet.Packet), ('json, rows', rows, packet.Packet)]
+    if MsgPackPacket:
+        modes.append(('msgpack, rows', rows, MsgPackPacket))
+    results = {label: measure(traffic, cls, args.repeat) for label, traffic, cls in modes}
+    base = results['json'][0]
+    print(f'players={args.players} heats={args.heats} packets={len(plain)}')
+    for label, (size, encode, decode) in results.items():
+        print(f'  {label:>14}: {size / 1e6:7.3f} MB ({size / base:4.0%})  '
+              f'encode {encode * 1000:7.1f} ms  decode {decode * 1000:7.1f} ms')
+    if not MsgPackPacket:
+        print('  msgpack is not installed; pip install msgpack to measure SOCKETIO_SERIALIZER=msgpack')
+
+    print('  bytes by event, json -> json rows:')
+    sizes = collections.defaultdict(lambda: [0, 0])
+    for column, traffic in enumerate((plain, rows)):
+        for name, event_args in traffic:
+            sizes[name][column] += len(packet.Packet(packet.EVENT, data=[name, *event_args]).encode().encode())
+    for name, (before, after) in sorted(sizes.items(), key=lambda item: -item[1][0])[:8]:
+        print(f'    {name:>20}: {before:9d} -> {after:9d}')
+
+
+if __name__ == '__main__':
+    main()
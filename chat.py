@@ -0,0 +1,62 @@
+import time
+from collections import deque
+
+
+class TokenBucket:
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated')
+
+    def __init__(self, rate, capacity, clock=time.time):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = clock()
+
+    def take(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class ChatRoom:
+    """Rate-limits one game's chat and queues accepted lines until the next batch flush.
+
+    Every accepted line gets a room-wide seq and is kept in a bounded history so a reconnecting
+    client can catch up on what it missed.
+    """
+
+    def __init__(self, player_rate=1.0, player_burst=3, room_rate=20.0, room_burst=40, history=100, clock=time.time):
+        self.clock = clock
+        self.player_rate = player_rate
+        self.player_burst = player_burst
+        self.room_bucket = TokenBucket(room_rate, room_burst, clock)
+        self.player_buckets = {}  # sid -> TokenBucket
+        self.pending = []
+        self.history = deque(maxlen=history)
+        self.seq = 0
+
+    def submit(self, sid, message):
+        """Queue a message; returns False when the sender or the room is over its rate"""
+        now = self.clock()
+        bucket = self.player_buckets.get(sid)
+        if bucket is None:
+            bucket = self.player_buckets[sid] = TokenBucket(self.player_rate, self.player_burst, self.clock)
+        if not bucket.take(now) or not self.room_bucket.take(now):
+            return False
+        self.seq += 1
+        message['seq'] = self.seq
+        self.pending.append(message)
+        self.history.append(message)
+        return True
+
+    def drain(self):
+        batch, self.pending = self.pending, []
+        return batch
+
+    def since(self, seq=0):
+        return [m for m in self.history if m['seq'] > seq]
+
+    def forget(self, sid):
+        self.player_buckets.pop(sid, None)
@@ -0,0 +1,96 @@
+import collections
+import hashlib
+import random
+import string
+import threading
+
+ALPHABET = string.ascii_uppercase + string.digits
+FEISTEL_ROUNDS = 4
+
+
+class CodeExhausted(Exception):
+    pass
+
+
+class CodeAllocator:
+    """Hands out game codes in O(1) from a secret random permutation of every code of `length` characters.
+
+    Index i maps to a code number through a Feistel network keyed with random bytes, cycle-walked until
+    it lands below N, so each code comes up exactly once without storing the pool and seeing some codes
+    says nothing about the others. Released codes go on a free list and are handed out again before any
+    fresh ones. Codes taken out of turn (e.g. by recovered games) are reserve()d and skipped; codes
+    another worker got to first are forget()-ten. Once every index is used the permutation is rekeyed,
+    so codes freed by other workers come round again.
+    """
+
+    def __init__(self, length=4, alphabet=ALPHABET, rng=None):
+        self.rng = rng or random.SystemRandom()
+        self.length = length
+        self.alphabet = alphabet
+        self.size = len(alphabet) ** length
+        self._half_bits = max(1, ((self.size - 1).bit_length() + 1) // 2)
+        self._half_mask = (1 << self._half_bits) - 1
+        self._rekey()
+        self._free = collections.deque()      # released codes, reused first
+        self._in_use = set()
+        self._lock = threading.Lock()
+
+    def _rekey(self):
+        self._key = self.rng.getrandbits(128).to_bytes(16, 'big')
+        self._next = 0                        # permutation index of the next fresh code
+
+    def _permute(self, n):
+        bits, mask = self._half_bits, self._half_mask
+        while True:
+            left, right = n >> bits, n & mask
+            for round_ in range(FEISTEL_ROUNDS):
+                digest = hashlib.blake2b(right.to_bytes(8, 'big'), digest_size=8, key=self._key,
+                                         person=round_.to_bytes(16, 'big')).digest()
+                left, right = right, left ^ (int.from_bytes(digest, 'big') & mask)
+            n = (left << bits) | right
+            # The network permutes [0, 4**bits), at most 4N; walk until the result is a code number
+            if n < self.size:
+                return n
+
+    def _code(self, index):
+        n = self._permute(index)
+        chars = []
+        for _ in range(self.length):
+            n, digit = divmod(n, len(self.alphabet))
+            chars.append(self.alphabet[digit])
+        return ''.join(chars)
+
+    def take(self):
+        with self._lock:
+            while True:
+                if self._free:
+                    code = self._free.popleft()
+                elif len(self._in_use) >= self.size:
+                    raise CodeExhausted(f'all {self.size} codes of length {self.length} are in use')
+                elif self._next < self.size:
+                    code = self._code(self._next)
+                    self._next += 1
+                else:
+                    self._rekey()
+                    continue
+                if code not in self._in_use:
+                    self._in_use.add(code)
+                    return code
+
+    def reserve(self, code):
+        with self._lock:
+            self._in_use.add(code)
+
+    def release(self, code):
+        with self._lock:
+            if code in self._in_use:
+                self._in_use.discard(code)
+                self._free.append(code)
+
+    def forget(self, code):
+        """Drop a code this worker took but couldn't store (another worker holds it), without reusing it"""
+        with self._lock:
+            self._in_use.discard(code)
+
+    def __len__(self):
+        return len(self._in_use)
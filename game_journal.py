@@ -0,0 +1,138 @@
+import logging
+import os
+import pickle
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class GameJournal:
+    """Per-game append-only event log with periodic snapshots, so games survive a restart.
+
+    `<directory>/<code>.snap` holds a pickled game and `<code>.log` the events appended since. An event
+    is (kind, changes) where each change key is a game attribute, or a tuple of an attribute followed by
+    keys into the dict it holds.
+    Appends go to buffered files; flush() does the fsync for every dirty log in one batch, and names the
+    games due a snapshot: those with snapshot_every events since their last one, and new games passed to
+    snapshot_soon(). The caller takes each snapshot() holding that game's lock, so no event lands between
+    the pickle and the log it replaces.
+    """
+
+    def __init__(self, directory, snapshot_every=200):
+        self.directory = directory
+        self.snapshot_every = snapshot_every
+        self._logs = {}    # code -> open log file
+        self._counts = {}  # code -> events since the last snapshot
+        self._dirty = set()
+        self._due = set()  # codes waiting for their first snapshot
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, code, ext):
+        return os.path.join(self.directory, f'{code}.{ext}')
+
+    def append(self, code, kind, changes):
+        blob = pickle.dumps((kind, changes), pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            log = self._logs.get(code)
+            if log is None:
+                log = self._logs[code] = open(self._path(code, 'log'), 'ab')
+            log.write(blob)
+            self._dirty.add(code)
+            self._counts[code] = self._counts.get(code, 0) + 1
+
+    def snapshot_soon(self, code):
+        """Have the next flush() name `code`, e.g. for a new game that has no snapshot yet"""
+        with self._lock:
+            self._due.add(code)
+
+    def flush(self):
+        """fsync every log written since the last flush; return the codes due for a snapshot"""
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            due, self._due = self._due, set()
+            for code in dirty:
+                log = self._logs.get(code)
+                if log:
+                    log.flush()
+                    os.fsync(log.fileno())
+            return list(due | {code for code in dirty if self._counts.get(code, 0) >= self.snapshot_every})
+
+    def snapshot(self, code, game):
+        """Write `game` as the new base for `code` and start an empty log after it; hold the game's lock"""
+        path = self._path(code, 'snap')
+        # Only this game's log is replaced, so other games keep appending while the file is written
+        blob = pickle.dumps(game, pickle.HIGHEST_PROTOCOL)
+        with open(path + '.tmp', 'wb') as f:
+            f.write(blob)
+            f.flush()
+            os.fsync(f.fileno())
+        with self._lock:
+            os.replace(path + '.tmp', path)
+            log = self._logs.pop(code, None)
+            if log:
+                log.close()
+            self._logs[code] = open(self._path(code, 'log'), 'wb')
+            self._counts[code] = 0
+            self._dirty.discard(code)
+
+    def drop(self, code):
+        with self._lock:
+            log = self._logs.pop(code, None)
+            if log:
+                log.close()
+            self._counts.pop(code, None)
+            self._dirty.discard(code)
+            self._due.discard(code)
+            for ext in ('log', 'snap'):
+                try:
+                    os.remove(self._path(code, ext))
+                except FileNotFoundError:
+                    pass
+
+    def recover(self):
+        """Yield (code, game) rebuilt from each snapshot plus its log; a torn final event is ignored"""
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith('.snap'):
+                continue
+            code = name[:-5]
+            try:
+                with open(self._path(code, 'snap'), 'rb') as f:
+                    game = pickle.load(f)
+            except (OSError, pickle.UnpicklingError, EOFError) as e:
+                logger.warning("journal_recover_failed game=%s error=%r", code, e)
+                continue
+            applied = 0
+            try:
+                with open(self._path(code, 'log'), 'rb') as f:
+                    while True:
+                        try:
+                            _, changes = pickle.load(f)
+                        except EOFError:
+                            break
+                        apply_changes(game, changes)
+                        applied += 1
+            except FileNotFoundError:
+                pass
+            except (pickle.UnpicklingError, ValueError, KeyError, TypeError) as e:
+                logger.warning("journal_replay_stopped game=%s events=%d error=%r", code, applied, e)
+            self._counts[code] = applied
+            yield code, game
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            for log in self._logs.values():
+                log.close()
+            self._logs.clear()
+
+
+def apply_changes(game, changes):
+    for key, value in changes.items():
+        if isinstance(key, tuple):
+            target = getattr(game, key[0])
+            for part in key[1:-1]:
+                target = target[part]
+            target[key[-1]] = value
+        else:
+            setattr(game, key, value)
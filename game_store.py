@@ -0,0 +1,232 @@
+import contextlib
+import pickle
+import secrets
+import threading
+import time
+
+NO_LOCK = contextlib.nullcontext()
+
+
+class GameStore:
+    """Game code -> Game. Hold lock(code) across reading, mutating and save()-ing a game; save() is what shared backends see."""
+
+    def get(self, code, default=None): raise NotImplementedError
+    def save(self, code, game): raise NotImplementedError
+    def pop(self, code, default=None): raise NotImplementedError
+    def codes(self): raise NotImplementedError
+    def add(self, code, game): raise NotImplementedError
+    def lock(self, code): raise NotImplementedError
+
+    def allocate(self, game, new_code, lost=None):
+        """Store `game` under the first code from new_code() that isn't taken, and return that code.
+
+        Each code that turns out to be taken (by another worker, with a shared store) is passed to `lost`.
+        """
+        while True:
+            code = new_code()
+            if self.add(code, game):
+                return code
+            if lost:
+                lost(code)
+
+    def __getitem__(self, code):
+        game = self.get(code)
+        if game is None:
+            raise KeyError(code)
+        return game
+
+    def __setitem__(self, code, game): self.save(code, game)
+    def __contains__(self, code): return self.get(code) is not None
+    def __iter__(self): return iter(self.codes())
+    def __len__(self): return len(self.codes())
+
+    def items(self):
+        for code in self.codes():
+            game = self.get(code)
+            if game is not None:
+                yield code, game
+
+    def values(self):
+        return (game for _, game in self.items())
+
+
+class InMemoryGameStore(GameStore):
+    """Games spread over shards with a lock each, plus a reentrant lock per game.
+
+    Shard locks are held only while a dict is touched. Handlers hold a game's lock across the whole
+    read-modify-save, so work on different games runs in parallel threads.
+    """
+
+    def __init__(self, shards=16):
+        self._shards = [({}, {}, threading.Lock()) for _ in range(shards)]  # (games, game locks, shard lock)
+
+    def _shard(self, code):
+        return self._shards[hash(code) % len(self._shards)]
+
+    def get(self, code, default=None): return self._shard(code)[0].get(code, default)
+
+    def save(self, code, game):
+        games, locks, shard_lock = self._shard(code)
+        with shard_lock:
+            games[code] = game
+            if code not in locks:
+                locks[code] = threading.RLock()
+
+    def add(self, code, game):
+        games, locks, shard_lock = self._shard(code)
+        with shard_lock:
+            if code in games:
+                return False
+            games[code] = game
+            locks[code] = threading.RLock()
+            return True
+
+    def pop(self, code, default=None):
+        games, locks, shard_lock = self._shard(code)
+        with shard_lock:
+            locks.pop(code, None)
+            return games.pop(code, default)
+
+    def lock(self, code):
+        """The game's lock, or a no-op one for a code with no game (callers find nothing to change)"""
+        games, locks, shard_lock = self._shard(code)
+        with shard_lock:
+            return locks.get(code, NO_LOCK)
+
+    def codes(self):
+        codes = []
+        for games, _, shard_lock in self._shards:
+            with shard_lock:
+                codes.extend(games)
+        return codes
+
+    def __contains__(self, code): return code in self._shard(code)[0]
+    def __len__(self): return sum(len(games) for games, _, _ in self._shards)
+
+
+class LockTimeout(Exception):
+    """Another worker held a game's Redis lock for longer than the wait allowed"""
+
+
+# Deletes the lock only while it still holds our token, so a lock that expired and was retaken isn't released
+RELEASE_LOCK = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class RedisGameLock:
+    """One game's lock across every worker: a key set with NX and PX to a random token, deleted on release.
+
+    Threads of this worker first take its striped RLock, so they queue locally rather than polling
+    Redis, and a thread that already holds the game (a locked function calling another) re-enters
+    without touching Redis again. The key expires after `ttl` seconds in case its worker dies
+    holding it; handlers finish in milliseconds, far inside that.
+    """
+
+    def __init__(self, store, code):
+        self.store = store
+        self.code = code
+        self.local = store._locks[hash(code) % len(store._locks)]
+
+    def __enter__(self):
+        self.local.acquire()
+        held = self.store._holding()
+        if self.code in held:
+            held[self.code][0] += 1
+            return self
+        try:
+            token = self._acquire()
+        except BaseException:
+            self.local.release()
+            raise
+        held[self.code] = [1, token]
+        return self
+
+    def __exit__(self, *exc):
+        held = self.store._holding()
+        entry = held[self.code]
+        entry[0] -= 1
+        try:
+            if not entry[0]:
+                del held[self.code]
+                self.store._release(keys=[self.store.lock_prefix + self.code], args=[entry[1]])
+        finally:
+            self.local.release()
+
+    def _acquire(self):
+        store, key = self.store, self.store.lock_prefix + self.code
+        token = secrets.token_hex(16)
+        deadline = time.monotonic() + store.lock_wait
+        delay = 0.001
+        while not store.redis.set(key, token, nx=True, px=int(store.lock_ttl * 1000)):
+            if time.monotonic() >= deadline:
+                raise LockTimeout(self.code)
+            time.sleep(delay)
+            delay = min(2 * delay, 0.05)
+        return token
+
+
+class RedisGameStore(GameStore):
+    """Games pickled under `<prefix><code>` so every worker process sees the same state.
+
+    lock(code) is a RedisGameLock under `<lock_prefix><code>`, so a read-modify-save in one worker
+    can't interleave with another worker's and overwrite its update.
+    """
+
+    def __init__(self, url=None, prefix='game:', client=None, lock_stripes=64, lock_prefix='lock:game:',
+                 lock_ttl=10.0, lock_wait=5.0):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url)
+        self.redis = client
+        self.prefix = prefix
+        self.lock_prefix = lock_prefix
+        self.lock_ttl = lock_ttl
+        self.lock_wait = lock_wait
+        self._locks = [threading.RLock() for _ in range(lock_stripes)]
+        self._held = threading.local()
+        self._release = client.register_script(RELEASE_LOCK)
+
+    def get(self, code, default=None):
+        if not code: return default
+        blob = self.redis.get(self.prefix + code)
+        return pickle.loads(blob) if blob is not None else default
+
+    def save(self, code, game):
+        self.redis.set(self.prefix + code, pickle.dumps(game, pickle.HIGHEST_PROTOCOL))
+
+    def add(self, code, game):
+        return bool(self.redis.set(self.prefix + code, pickle.dumps(game, pickle.HIGHEST_PROTOCOL), nx=True))
+
+    def lock(self, code):
+        return RedisGameLock(self, code) if code else NO_LOCK
+
+    def _holding(self):
+        """code -> [depth, token] for the game locks this thread holds"""
+        codes = getattr(self._held, 'codes', None)
+        if codes is None:
+            codes = self._held.codes = {}
+        return codes
+
+    def pop(self, code, default=None):
+        pipe = self.redis.pipeline()
+        pipe.get(self.prefix + code)
+        pipe.delete(self.prefix + code)
+        blob, _ = pipe.execute()
+        return pickle.loads(blob) if blob is not None else default
+
+    def codes(self):
+        start = len(self.prefix)
+        return [key.decode()[start:] for key in self.redis.scan_iter(match=self.prefix + '*')]
+
+    def __contains__(self, code):
+        return bool(code) and bool(self.redis.exists(self.prefix + code))
+
+
+def create_game_store(url=None):
+    if url:
+        return RedisGameStore(url)
+    return InMemoryGameStore()
@@ -0,0 +1,84 @@
+import bisect
+
+
+class Leaderboard:
+    """Player ids bucketed by score, kept up to date as points are awarded.
+
+    Scores only move by a few fixed awards, so there are far fewer distinct scores than players. Top K,
+    ranks and the current leaders come from walking the buckets from the top, never from sorting players.
+    Ranks are competition ranks: 1 + the number of players with a higher score.
+    """
+
+    __slots__ = ('_buckets', '_scores', '_score_of')
+
+    def __init__(self):
+        self._buckets = {}   # score -> {player id: None}, in the order players reached that score
+        self._scores = []    # distinct scores, ascending
+        self._score_of = {}  # player id -> score
+
+    def set(self, pid, score):
+        """Add `pid` with `score`, or move it there"""
+        old = self._score_of.get(pid)
+        if old == score: return
+        if old is not None:
+            self._leave(pid, old)
+        bucket = self._buckets.get(score)
+        if bucket is None:
+            bucket = self._buckets[score] = {}
+            bisect.insort(self._scores, score)
+        bucket[pid] = None
+        self._score_of[pid] = score
+
+    def remove(self, pid):
+        score = self._score_of.pop(pid, None)
+        if score is not None:
+            self._leave(pid, score)
+
+    def _leave(self, pid, score):
+        bucket = self._buckets[score]
+        del bucket[pid]
+        if not bucket:
+            del self._buckets[score]
+            del self._scores[bisect.bisect_left(self._scores, score)]
+
+    def top(self, k):
+        """Up to `k` (player id, score) pairs, best first"""
+        result = []
+        for score in reversed(self._scores):
+            for pid in self._buckets[score]:
+                if len(result) == k:
+                    return result
+                result.append((pid, score))
+        return result
+
+    def leaders(self):
+        """(best score, ids on it), or (None, []) when the board is empty"""
+        if not self._scores:
+            return None, []
+        score = self._scores[-1]
+        return score, list(self._buckets[score])
+
+    def ranks(self):
+        """[score, rank] for every distinct score, best first; a player's rank is the entry for their score"""
+        result = []
+        above = 0
+        for score in reversed(self._scores):
+            result.append([score, above + 1])
+            above += len(self._buckets[score])
+        return result
+
+    def rank(self, pid):
+        score = self._score_of.get(pid)
+        if score is None:
+            return None
+        above = 0
+        for other in reversed(self._scores):
+            if other == score:
+                return above + 1
+            above += len(self._buckets[other])
+
+    def __contains__(self, pid):
+        return pid in self._score_of
+
+    def __len__(self):
+        return len(self._score_of)
@@ -0,0 +1,140 @@
+import bisect
+import logging
+import queue
+import threading
+import time
+from functools import wraps
+from logging.handlers import QueueHandler, QueueListener
+
+from socketio import packet
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class Metrics:
+    """Handler latency histograms, call and emit counters, and gauges read at scrape time.
+
+    Emit bytes are counted where python-socketio encodes the packet (see packet_class), so they are the
+    bytes of whichever serializer is in use and the payload isn't encoded a second time to measure it.
+    render() produces the Prometheus text exposition format.
+    """
+
+    def __init__(self, prefix='gameshow', buckets=LATENCY_BUCKETS):
+        self.prefix = prefix
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._latency = {}  # event -> [bucket counts..., +Inf count, sum]
+        self._errors = {}   # event -> count
+        self._emits = {}    # event -> [count, bytes]
+        self._gauges = {}   # name -> (help, fn)
+
+    def observe(self, event, seconds):
+        with self._lock:
+            row = self._latency.get(event)
+            if row is None:
+                row = self._latency[event] = [0] * (len(self.buckets) + 1) + [0.0]
+            row[bisect.bisect_left(self.buckets, seconds)] += 1
+            row[-1] += seconds
+
+    def handler_failed(self, event):
+        with self._lock:
+            self._errors[event] = self._errors.get(event, 0) + 1
+
+    def emitted(self, event):
+        with self._lock:
+            row = self._emits.get(event)
+            if row is None:
+                row = self._emits[event] = [0, 0]
+            row[0] += 1
+
+    def encoded(self, event, size):
+        with self._lock:
+            row = self._emits.get(event)
+            if row is None:
+                row = self._emits[event] = [0, 0]
+            row[1] += size
+
+    def packet_class(self, serializer='default'):
+        """The packet class for python-socketio's `serializer` argument, adding each encoded event's size here"""
+        if serializer == 'msgpack':
+            from socketio.msgpack_packet import MsgPackPacket as base
+        else:
+            base = packet.Packet
+        metrics = self
+
+        class MeteredPacket(base):
+            def encode(self):
+                encoded = super().encode()
+                if self.packet_type in (packet.EVENT, packet.BINARY_EVENT):
+                    metrics.encoded(self.data[0], encoded_size(encoded))
+                return encoded
+        return MeteredPacket
+
+    def gauge(self, name, help_text, fn):
+        self._gauges[name] = (help_text, fn)
+
+    def timed(self, event, handler):
+        @wraps(handler)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return handler(*args, **kwargs)
+            except Exception:
+                self.handler_failed(event)
+                raise
+            finally:
+                self.observe(event, time.perf_counter() - started)
+        return wrapper
+
+    def render(self):
+        p = self.prefix
+        with self._lock:
+            latency = {event: list(row) for event, row in self._latency.items()}
+            errors = dict(self._errors)
+            emits = {event: list(row) for event, row in self._emits.items()}
+
+        lines = [f'# HELP {p}_handler_seconds Socket.IO handler latency',
+                 f'# TYPE {p}_handler_seconds histogram']
+        for event, row in sorted(latency.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), row):
+                cumulative += count
+                lines.append(f'{p}_handler_seconds_bucket{{event="{event}",le="{bound}"}} {cumulative}')
+            lines.append(f'{p}_handler_seconds_sum{{event="{event}"}} {row[-1]}')
+            lines.append(f'{p}_handler_seconds_count{{event="{event}"}} {cumulative}')
+
+        lines += [f'# HELP {p}_handler_errors_total Socket.IO handlers that raised',
+                  f'# TYPE {p}_handler_errors_total counter']
+        lines += [f'{p}_handler_errors_total{{event="{event}"}} {n}' for event, n in sorted(errors.items())]
+
+        lines += [f'# HELP {p}_emits_total Server emits by event', f'# TYPE {p}_emits_total counter']
+        lines += [f'{p}_emits_total{{event="{event}"}} {row[0]}' for event, row in sorted(emits.items())]
+        lines += [f'# HELP {p}_emit_bytes_total Encoded packet bytes by event, once per emit rather than per recipient',
+                  f'# TYPE {p}_emit_bytes_total counter']
+        lines += [f'{p}_emit_bytes_total{{event="{event}"}} {row[1]}' for event, row in sorted(emits.items())]
+
+        for name, (help_text, fn) in sorted(self._gauges.items()):
+            lines += [f'# HELP {p}_{name} {help_text}', f'# TYPE {p}_{name} gauge', f'{p}_{name} {fn()}']
+        return '\n'.join(lines) + '\n'
+
+
+def encoded_size(encoded):
+    """Bytes of an encoded packet: text, MessagePack bytes, or a list of text and binary attachments"""
+    if isinstance(encoded, list):
+        return sum(map(encoded_size, encoded))
+    if isinstance(encoded, str):
+        return len(encoded) if encoded.isascii() else len(encoded.encode())
+    return len(encoded)
+
+
+def setup_queue_logging(level=logging.INFO):
+    """Route the root logger through a queue so handlers only enqueue; a listener thread does the writing"""
+    records = queue.SimpleQueue()
+    stream = logging.StreamHandler()
+    stream.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s %(message)s'))
+    listener = QueueListener(records, stream, respect_handler_level=True)
+    root = logging.getLogger()
+    root.addHandler(QueueHandler(records))
+    root.setLevel(level)
+    listener.start()
+    return listener
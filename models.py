@@ -0,0 +1,299 @@
+import base64
+import collections
+import hashlib
+import hmac
+import random
+import time
+
+from leaderboard import Leaderboard
+from placement import CirclePlacer
+
+
+class Player:
+    """One student for the life of a game. `id` never changes; `sid` is rebound on reconnect and is None while away."""
+
+    __slots__ = ('id', 'sid', 'username', 'color', 'position', 'score', 'role', 'heat', 'disconnect_time')
+    WIRE_FIELDS = ('sid', 'username', 'color', 'position')
+    compact = False  # send WIRE_FIELDS rows instead of dicts; static/wire.js expands them on the client
+
+    def __init__(self, id, sid, username, color, position):
+        self.id = id
+        self.sid = sid
+        self.username = username
+        self.color = color
+        self.position = position  # (top, left), shared with the placer's sampled level
+        self.score = 0
+        self.role = None  # 'contestant' or 'audience' while a round is running
+        self.heat = None  # index into Game.heats while a round is running
+        self.disconnect_time = None
+
+    def wire(self):
+        """The roster entry clients see; built per call, Game.roster() keeps the lobby's copy"""
+        position = None
+        if self.position:
+            position = {'top': self.position[0], 'left': self.position[1]}
+        row = [self.sid, self.username, self.color, position]
+        return row if self.compact else dict(zip(self.WIRE_FIELDS, row))
+
+    def __setstate__(self, state):
+        for name, value in state[1].items():
+            setattr(self, name, value)
+
+
+class Game:
+    __slots__ = (
+        'host_sid', 'host_token', 'host_verified', 'host_disconnected', 'host_disconnect_time', 'bank',
+        'state', 'round_number', 'questions_used', 'current_question', 'players', 'by_sid',
+        'next_player_id', 'contestants', 'heats', 'rotation', 'round_size', 'answers', 'votes',
+        'answer_seconds', 'answer_counts', 'vote_counts', 'correct_answers', 'leaderboard', 'phase_id', 'phase_deadline', 'placer',
+        'roster_seq', 'last_active', '_roster', '_snapshot',
+    )
+    CACHES = ('_roster', '_snapshot')
+
+    def __init__(self, host_sid, host_token, bank='default'):
+        self.host_sid = host_sid
+        self.host_token = host_token
+        self.host_verified = False
+        self.host_disconnected = False
+        self.host_disconnect_time = None
+        self.bank = bank
+        self.state = 'lobby'
+        self.round_number = 1
+        self.questions_used = set()
+        self.current_question = None
+        self.players = {}      # player id -> Player, including players inside their disconnect window
+        self.by_sid = {}       # sid -> connected Player
+        self.next_player_id = 1
+        self.contestants = []  # player ids answering the current question, across all heats
+        self.heats = []        # [contestant id, contestant id] per heat; the audience is split across them
+        self.rotation = None   # player ids still to have a turn this round, in shuffled order
+        self.round_size = 0    # contestants + audience when the current question started
+        self.answers = {}      # player id -> answer
+        self.votes = {}        # voter id -> contestant id
+        self.answer_seconds = {}     # player id -> seconds from the question going out to their latest answer
+        self.answer_counts = []      # option index -> audience answers, kept in step with `answers`
+        self.vote_counts = {}        # contestant id -> votes, kept in step with `votes`
+        self.correct_answers = set()  # audience ids whose current answer is right
+        self.leaderboard = Leaderboard()  # connected players by score
+        self.phase_id = 0
+        self.phase_deadline = None
+        self.placer = CirclePlacer()
+        self.roster_seq = 0    # bumped on every player_added/player_removed delta sent to the lobby
+        self.last_active = time.time()  # when any worker last saved the game; idle expiry goes by this
+        self._roster = None
+        self._snapshot = None
+
+    def add_player(self, sid, username, color):
+        player = Player(self.next_player_id, sid, username, color, self.placer.place())
+        self.next_player_id += 1
+        self.players[player.id] = player
+        self.by_sid[sid] = player
+        self.leaderboard.set(player.id, 0)
+        self._roster = None
+        return player
+
+    def rebind(self, player, sid):
+        """Point `player` at a new sid, or None when they disconnect"""
+        if self.by_sid.get(player.sid) is player:
+            del self.by_sid[player.sid]
+        player.sid = sid
+        self._roster = None
+        if sid is None:
+            self.leaderboard.remove(player.id)
+        else:
+            self.by_sid[sid] = player
+            self.leaderboard.set(player.id, player.score)
+
+    def award(self, player, points):
+        player.score += points
+        if player.id in self.leaderboard:
+            self.leaderboard.set(player.id, player.score)
+
+    def drop_player(self, player):
+        self.rebind(player, None)
+        self.players.pop(player.id, None)
+        self.placer.release(player.position)
+
+    def reindex(self):
+        """Rebuild the sid lookup, leaderboard and tallies, e.g. after replaying a journal"""
+        self.by_sid = {p.sid: p for p in self.players.values() if p.sid is not None}
+        self.leaderboard = Leaderboard()
+        for player in self.by_sid.values():
+            self.leaderboard.set(player.id, player.score)
+        self._roster = self._snapshot = None
+        self.retally()
+
+    def resume_token(self, player):
+        """`<player id>.<mac>`, signed with the game's host token, that a client presents to reclaim its player"""
+        mac = hashlib.blake2b(str(player.id).encode(), key=self.host_token.encode()[:64], digest_size=16).digest()
+        return f'{player.id}.{base64.urlsafe_b64encode(mac).decode().rstrip("=")}'
+
+    def resume(self, token):
+        """The player `token` was issued to, or None if it isn't valid for this game"""
+        if not isinstance(token, str): return None
+        pid = token.partition('.')[0]
+        player = self.players.get(int(pid)) if pid.isdigit() else None
+        if player and hmac.compare_digest(token, self.resume_token(player)):
+            return player
+        return None
+
+    def next_contestants(self, count):
+        """Take up to `count` connected players off the rotation. Everyone has a turn before anyone goes twice;
+        when the queue runs dry it is refilled with a fresh shuffle and round_number moves on."""
+        picked = {}
+        while len(picked) < count:
+            if not self.rotation:
+                refill = [p.id for p in self.by_sid.values() if p.id not in picked]
+                if not refill: break
+                random.shuffle(refill)
+                if self.rotation is not None:
+                    self.round_number += 1
+                self.rotation = collections.deque(refill)
+            player = self.players.get(self.rotation.popleft())
+            # Players who have left lose this turn; they are back in the next shuffle if they return
+            if player and player.sid is not None:
+                picked[player.id] = player
+        return list(picked.values())
+
+    def start_round(self, question, heats):
+        """Pick `heats` contestant pairs off the rotation and deal everyone else out across them as audience"""
+        connected = list(self.by_sid.values())
+        contestants = self.next_contestants(2 * heats)
+        for player in self.players.values():
+            player.role = player.heat = None
+        self.heats = [[p.id for p in contestants[i:i + 2]] for i in range(0, len(contestants) - 1, 2)]
+        for heat, pair in enumerate(self.heats):
+            for pid in pair:
+                self.players[pid].role = 'contestant'
+                self.players[pid].heat = heat
+        audience = [p for p in connected if p.role is None]
+        random.shuffle(audience)
+        for n, player in enumerate(audience):
+            player.role = 'audience'
+            player.heat = n % len(self.heats)
+        self.contestants = [pid for pair in self.heats for pid in pair]
+        self.round_size = len(connected)
+        self.current_question = question
+        self.answer_seconds = {}
+        self.start_tallies()
+
+    def heat_players(self, heat):
+        return [self.players[pid] for pid in self.heats[heat] if pid in self.players]
+
+    def start_tallies(self):
+        """Clear answers and votes for the current question; call once `contestants` is set"""
+        self.answers = {}
+        self.votes = {}
+        self.answer_counts = [0] * len(self.current_question.options) if self.current_question else []
+        self.vote_counts = dict.fromkeys(self.contestants, 0)
+        self.correct_answers = set()
+
+    def record_answer(self, player, answer, seconds=None):
+        """Store `player`'s answer, replacing any earlier one, and update the running tallies"""
+        if seconds is not None:
+            self.answer_seconds[player.id] = seconds
+        if player.role == 'audience':
+            if player.id in self.answers:
+                self._count_answer(self.answers[player.id], -1)
+            self._count_answer(answer, 1)
+            if self.current_question and answer == self.current_question.correct_answer_index:
+                self.correct_answers.add(player.id)
+            else:
+                self.correct_answers.discard(player.id)
+        self.answers[player.id] = answer
+
+    def _count_answer(self, answer, delta):
+        if type(answer) is int and 0 <= answer < len(self.answer_counts):
+            self.answer_counts[answer] += delta
+
+    def record_vote(self, voter, contestant_id):
+        self.votes[voter.id] = contestant_id
+        if contestant_id in self.vote_counts:
+            self.vote_counts[contestant_id] += 1
+
+    def retally(self):
+        """Rebuild the tallies from `answers` and `votes`, e.g. after replaying a journal"""
+        answers, votes = self.answers, self.votes
+        self.start_tallies()
+        for pid, answer in answers.items():
+            if pid in self.players:
+                self.record_answer(self.players[pid], answer)
+            else:
+                self.answers[pid] = answer
+        for voter_id, contestant_id in votes.items():
+            self.votes[voter_id] = contestant_id
+            if contestant_id in self.vote_counts:
+                self.vote_counts[contestant_id] += 1
+
+    def tally(self):
+        """Live counts for the host while a question is running"""
+        return {
+            'phase': self.state,
+            'answers': len(self.answers),
+            'votes': len(self.votes),
+            'answers_expected': self.round_size,
+            'votes_expected': self.round_size - len(self.contestants),
+            'answer_counts': self.answer_counts,
+            'vote_counts': [{'username': p.username, 'heat': p.heat, 'votes': self.vote_counts.get(p.id, 0)}
+                            for p in self.contestant_players()],
+        }
+
+    def connected(self):
+        return list(self.by_sid.values())
+
+    def roster(self):
+        """Wire roster of connected players.
+
+        Lobby pages ask for it on every join and reconnect, so there it is cached until a player joins,
+        leaves or changes sid; once the game has started it is built per call rather than held.
+        """
+        if self.state != 'lobby':
+            self._roster = None
+            return [p.wire() for p in self.by_sid.values()]
+        if self._roster is None:
+            self._roster = [p.wire() for p in self.by_sid.values()]
+        return self._roster
+
+    def snapshot(self):
+        """The part of a reconnecting player's identity_confirmed that is the same for everyone, cached per phase.
+
+        It leaves out the roster, which every reconnect changes; the game page only draws contestants.
+        """
+        key = (self.state, self.phase_id)
+        if self._snapshot is None or self._snapshot[0] != key:
+            question = None
+            if self.current_question and self.state in ['answering', 'voting']:
+                question = {'question': self.current_question.question, 'options': self.current_question.options}
+            self._snapshot = (key, {
+                'is_host': False,
+                'game_state': self.state,
+                'current_question': question,
+                'phase_deadline': self.phase_deadline,
+            })
+        return self._snapshot[1]
+
+    def standings(self, changed=(), k=10):
+        """Top `k` plus the score -> rank table; with `changed`, also those players' new scores by sid"""
+        top = [[self.players[pid].username, self.players[pid].color, score] for pid, score in self.leaderboard.top(k)]
+        return {
+            'top': top if Player.compact else [dict(zip(('username', 'color', 'score'), row)) for row in top],
+            'ranks': self.leaderboard.ranks(),
+            'changed': {p.sid: p.score for p in changed if p.sid is not None},
+        }
+
+    def scores(self):
+        return {sid: p.score for sid, p in self.by_sid.items()}
+
+    def contestant_players(self):
+        return [self.players[pid] for pid in self.contestants if pid in self.players]
+
+    def __getstate__(self):
+        state = {name: getattr(self, name) for name in self.__slots__}
+        state.update(dict.fromkeys(self.CACHES))
+        return state
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+        for name in self.CACHES:
+            setattr(self, name, None)
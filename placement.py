@@ -0,0 +1,163 @@
+import math
+import random
+from array import array
+import threading
+
+
+class CirclePlacer:
+    """Hands out lobby positions from Poisson-disk samples.
+
+    Samples are generated a level at a time with Bridson's algorithm on a uniform grid. Level 0 uses
+    the full spacing; once it is used up the next level halves the spacing and fills the gaps
+    between existing circles. Levels are sampled once per parameter set and shared by every game;
+    call prepare() at startup so no join pays for sampling. Each game walks the current level in its
+    own shuffled order, kept as an array of indices into the shared level, so a join takes the next slot
+    in O(1). Positions handed out are (top, left) tuples from the shared level, not per-player copies.
+
+    Pickled, a placer is its parameters, shuffle seed and position in the current level, plus any
+    released or skipped slots; the shared levels and the shuffled order are rebuilt on load.
+    """
+
+    _levels = {}  # (params, seed) -> list of sampled levels
+    _sampling = threading.Lock()
+
+    def __init__(self, min_distance=15, top=(10, 75), left=(5, 90), seed=None, attempts=30, min_spacing=1.0):
+        self.min_distance = min_distance
+        self.top = top
+        self.left = left
+        self.attempts = attempts
+        self.min_spacing = min_spacing
+        self.seed = seed
+        self.shuffle_seed = random.getrandbits(64) if seed is None else seed
+        self.level = -1
+        self.remaining = 0   # slots of the current level not handed out yet: order[:remaining]
+        self.released = []   # slots given back by players who left, handed out first
+        self.skip = set()    # slots of order[:remaining] already taken, see exclude()
+        self._attach()
+
+    def _attach(self):
+        self.levels = self._levels.setdefault(self._key(), [])
+        self.rng = random.Random(self.shuffle_seed)  # only for overlapping positions once every level is used
+        self.order = self._shuffled(self.level) if self.level >= 0 else array('H')
+
+    def _key(self):
+        return self.min_distance, self.top, self.left, self.attempts, self.min_spacing, self.seed
+
+    def __getstate__(self):
+        return {'params': self._key(), 'shuffle_seed': self.shuffle_seed, 'level': self.level,
+                'remaining': self.remaining, 'released': self.released, 'skip': self.skip}
+
+    def __setstate__(self, state):
+        self.min_distance, self.top, self.left, self.attempts, self.min_spacing, self.seed = state['params']
+        self.shuffle_seed = state['shuffle_seed']
+        self.level = state['level']
+        self.remaining = state['remaining']
+        self.released = state['released']
+        self.skip = state['skip']
+        self._attach()
+
+    def prepare(self):
+        """Sample every level this parameter set will use; returns how many slots they hold"""
+        level = 0
+        while self.min_distance / 2 ** level >= self.min_spacing:
+            self._sampled(level)
+            level += 1
+        return sum(len(points) for points in self.levels)
+
+    def place(self):
+        if self.released:
+            return self.released.pop()
+        while True:
+            if not self.remaining and not self._fill_next_level():
+                # Densest level exhausted; overlap rather than refuse the join
+                return self.rng.uniform(*self.top), self.rng.uniform(*self.left)
+            self.remaining -= 1
+            slot = self.levels[self.level][self.order[self.remaining]]
+            if slot in self.skip:
+                self.skip.discard(slot)
+                continue
+            return slot
+
+    def release(self, position):
+        if position:
+            self.released.append(position)
+
+    def exclude(self, taken):
+        """Stop handing out the `taken` slots, e.g. positions of players replayed from a journal"""
+        self.released = [p for p in self.released if p not in taken]
+        points = self.levels[self.level] if self.level >= 0 else []
+        ahead = {points[i] for i in self.order[:self.remaining]}
+        level = self.level + 1
+        while self.min_distance / 2 ** level >= self.min_spacing:
+            ahead.update(self._sampled(level))
+            level += 1
+        self.skip |= taken & ahead
+
+    def _fill_next_level(self):
+        while self.min_distance / 2 ** (self.level + 1) >= self.min_spacing:
+            self.level += 1
+            self.order = self._shuffled(self.level)
+            self.remaining = len(self.order)
+            if self.remaining:
+                return True
+        return False
+
+    def _shuffled(self, level):
+        order = list(range(len(self._sampled(level))))
+        random.Random(f'{self.shuffle_seed}:{level}').shuffle(order)
+        return array('H' if len(order) <= 0xFFFF else 'I', order)
+
+    def _sampled(self, level):
+        if len(self.levels) <= level:
+            with self._sampling:
+                while len(self.levels) <= level:
+                    n = len(self.levels)
+                    points = [p for sampled in self.levels for p in sampled]
+                    rng = random.Random(None if self.seed is None else f'{self.seed}:{n}')
+                    self.levels.append(self._sample(self.min_distance / 2 ** n, points, rng))
+        return self.levels[level]
+
+    def _sample(self, radius, points, rng):
+        cell = radius / math.sqrt(2)
+        grid = {}
+
+        def key(p):
+            return int((p[0] - self.top[0]) // cell), int((p[1] - self.left[0]) // cell)
+
+        def fits(p):
+            if not (self.top[0] <= p[0] <= self.top[1] and self.left[0] <= p[1] <= self.left[1]):
+                return False
+            ci, cj = key(p)
+            for i in range(ci - 2, ci + 3):
+                for j in range(cj - 2, cj + 3):
+                    q = grid.get((i, j))
+                    if q and (p[0] - q[0]) ** 2 + (p[1] - q[1]) ** 2 < radius * radius:
+                        return False
+            return True
+
+        for p in points:
+            grid[key(p)] = p
+        active = list(points)
+        new_points = []
+        if not active:
+            first = (rng.uniform(*self.top), rng.uniform(*self.left))
+            grid[key(first)] = first
+            active.append(first)
+            new_points.append(first)
+
+        while active:
+            idx = rng.randrange(len(active))
+            base = active[idx]
+            for _ in range(self.attempts):
+                angle = rng.uniform(0, 2 * math.pi)
+                dist = rng.uniform(radius, 2 * radius)
+                p = (base[0] + dist * math.sin(angle), base[1] + dist * math.cos(angle))
+                if fits(p):
+                    grid[key(p)] = p
+                    active.append(p)
+                    new_points.append(p)
+                    break
+            else:
+                active[idx] = active[-1]
+                active.pop()
+        return new_points
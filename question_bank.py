@@ -0,0 +1,114 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+log = logging.getLogger(__name__)
+
+
+class Question:
+    __slots__ = ('id', 'question', 'options', 'correct_answer_index')
+
+    def __init__(self, id, question, options, correct_answer_index):
+        object.__setattr__(self, 'id', id)
+        object.__setattr__(self, 'question', question)
+        object.__setattr__(self, 'options', tuple(options))
+        object.__setattr__(self, 'correct_answer_index', correct_answer_index)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Question is immutable')
+
+    def __reduce__(self):
+        return Question, (self.id, self.question, self.options, self.correct_answer_index)
+
+    def to_dict(self):
+        return {
+            'id': self.id, 'question': self.question,
+            'options': list(self.options), 'correct_answer_index': self.correct_answer_index
+        }
+
+
+class QuestionBank:
+    """Questions indexed by id, with the host payload serialized once and versioned by content hash"""
+
+    def __init__(self, questions):
+        self.questions = tuple(questions)
+        self.by_id = {q.id: q for q in self.questions}
+        self.payload = json.dumps([q.to_dict() for q in self.questions], separators=(',', ':'))
+        self.version = hashlib.sha1(self.payload.encode()).hexdigest()[:16]
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r') as f:
+            return cls(Question(**q) for q in json.load(f))
+
+    def get(self, question_id):
+        return self.by_id.get(question_id)
+
+    def __len__(self):
+        return len(self.questions)
+
+
+class QuestionBankRegistry:
+    """Named banks under a directory, parsed on first use, reloaded when their file changes, LRU-evicted.
+
+    `<directory>/<name>.json` is bank `name`; `default_path` (if given) backs the 'default' bank.
+    """
+
+    def __init__(self, directory, default_path=None, max_banks=8, check_interval=2.0):
+        self.directory = directory
+        self.default_path = default_path
+        self.max_banks = max_banks
+        self.check_interval = check_interval
+        self._banks = OrderedDict()  # name -> (bank, mtime, last stat time)
+        self._lock = threading.Lock()
+
+    def path_for(self, name):
+        if name == 'default' and self.default_path:
+            return self.default_path
+        if not name or os.sep in name or name.startswith('.'):
+            return None
+        return os.path.join(self.directory, name + '.json')
+
+    def names(self):
+        names = {'default'} if self.default_path and os.path.exists(self.default_path) else set()
+        if os.path.isdir(self.directory):
+            names.update(f[:-5] for f in os.listdir(self.directory) if f.endswith('.json'))
+        return sorted(names)
+
+    def __contains__(self, name):
+        path = self.path_for(name)
+        return path is not None and os.path.exists(path)
+
+    def get(self, name):
+        """The bank called `name`, or None if it has no file. A bank that fails to parse keeps its last good copy."""
+        path = self.path_for(name)
+        if path is None:
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._banks.get(name)
+            if entry and now - entry[2] < self.check_interval:
+                self._banks.move_to_end(name)
+                return entry[0]
+            try:
+                mtime = os.path.getmtime(path)
+            except OSError:
+                self._banks.pop(name, None)
+                return None
+            if entry and entry[1] == mtime:
+                bank = entry[0]
+            else:
+                try:
+                    bank = QuestionBank.load(path)
+                except (IOError, json.JSONDecodeError, TypeError) as e:
+                    log.warning("question_bank_load_failed bank=%s error=%r", name, e)
+                    bank = entry[0] if entry else QuestionBank([])
+            self._banks[name] = (bank, mtime, now)
+            self._banks.move_to_end(name)
+            while len(self._banks) > self.max_banks:
+                self._banks.popitem(last=False)
+            return bank
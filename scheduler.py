@@ -0,0 +1,55 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+
+class Scheduler:
+    """A single deadline heap shared by every game, drained by one background loop."""
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self._heap = []
+        self._seq = itertools.count()
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def call_at(self, deadline, fn, *args):
+        handle = next(self._seq)
+        with self._lock:
+            heapq.heappush(self._heap, (deadline, handle, fn, args))
+            self._pending.add(handle)
+        return handle
+
+    def call_later(self, delay, fn, *args):
+        return self.call_at(self.clock() + delay, fn, *args)
+
+    def cancel(self, handle):
+        if handle is not None:
+            with self._lock:
+                self._pending.discard(handle)
+
+    def run_due(self):
+        """Run every callback whose deadline has passed; return seconds until the next one (or None)."""
+        while True:
+            with self._lock:
+                if not self._heap:
+                    return None
+                deadline, handle, fn, args = self._heap[0]
+                delay = deadline - self.clock()
+                if delay > 0:
+                    return delay
+                heapq.heappop(self._heap)
+                if handle not in self._pending:
+                    continue
+                self._pending.discard(handle)
+            try:
+                fn(*args)
+            except Exception:
+                log.exception("scheduled_task_failed task=%s", getattr(fn, '__name__', fn))
+
+    def __len__(self):
+        return len(self._pending)
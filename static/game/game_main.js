@@ -1,6 +1,6 @@
 const GameMain = {
     init() {
-        GameState.socket = io();
+        GameState.socket = Wire.attach(io());
         this.bindSocketEvents();
         this.bindDOMEvents();
 
@@ -11,16 +11,17 @@ const GameMain = {
             const isHostReferrer = document.referrer.includes(`/host/${GAME_CODE}`);
             
             const hostToken = localStorage.getItem(`host_token_${GAME_CODE}`);
-            const username = localStorage.getItem(`username_${GAME_CODE}`);
+            const resumeToken = localStorage.getItem(`resume_${GAME_CODE}`);
 
             let announcementPayload = { game_code: GAME_CODE };
 
             if (isHostReferrer && hostToken) {
                 announcementPayload.host_token = hostToken;
+                announcementPayload.questions_version = localStorage.getItem('questions_version');
                 console.log('Announcing as host');
-            } else if (username) {
-                announcementPayload.username = username;
-                console.log('Announcing as player:', username);
+            } else if (resumeToken) {
+                announcementPayload.resume_token = resumeToken;
+                console.log('Announcing as player');
             } else {
                 alert('Please rejoin the game.');
                 window.location.href = '/join';
@@ -38,22 +39,34 @@ const GameMain = {
             GameState.isHost = data.is_host;
             GameState.myUsername = data.username;
             GameState.myColor = data.color || '#FFFFFF';
-            GameState.players = data.players;
+            // Only the host's snapshot carries the roster; students on this page only see contestants
+            if (data.players) GameState.applyRosterSnapshot({ players: data.players, seq: data.roster_seq });
             GameState.mySid = socket.id;
             
             if (data.my_score !== undefined) {
                 GameState.myScore = data.my_score;
                 if (!data.is_host) {
-                    GameUI.updateMyScore(data.my_score);
+                    GameUI.updateMyScore(data.my_score, data.my_rank);
                 }
             }
             
-            GameUI.updatePlayerList(data.players, data.current_contestants || []);
+            GameUI.updatePlayerList(GameState.players, data.current_contestants || []);
+
+            if (data.phase_deadline && ['answering', 'voting'].includes(data.game_state)) {
+                const phase = data.game_state === 'answering' ? 'Answering' : 'Voting';
+                GameUI.startCountdown(data.phase_deadline, data.server_time, phase);
+            }
 
             if (data.is_host) {
-                GameUI.setupHostDashboard(data.questions, data.used_question_ids);
+                if (data.questions_json) {
+                    localStorage.setItem('questions_version', data.questions_version);
+                    localStorage.setItem('questions_json', data.questions_json);
+                }
+                const questions = JSON.parse(data.questions_json || localStorage.getItem('questions_json') || '[]');
+                GameUI.setupHostDashboard(questions, data.used_question_ids);
             } else {
                 GameUI.studentChat.classList.remove('hidden');
+                GameMain.addChatMessages(data.chat_history || []);
                 
                 console.log('Player game state:', data.game_state);
                 
@@ -73,7 +86,7 @@ const GameMain = {
                             submitBtn.disabled = false;
                             submitBtn.textContent = 'Submit Answer';
                         }
-                        GameUI.updatePlayerList(data.players, data.current_contestants);
+                        GameUI.updatePlayerList(GameState.players, data.current_contestants);
                     } else if (data.is_audience && data.current_question) {
                         console.log('Syncing as audience in answering phase');
                         GameState.myRole = 'audience';
@@ -95,7 +108,7 @@ const GameMain = {
                             };
                             GameUI.audienceOptionsGrid.appendChild(btn);
                         });
-                        GameUI.updatePlayerList(data.players, data.current_contestants);
+                        GameUI.updatePlayerList(GameState.players, data.current_contestants);
                     }
                 } else {
                     GameUI.showView(GameUI.waitingView);
@@ -104,8 +117,16 @@ const GameMain = {
         });
         
         socket.on('update_player_list', (data) => {
-            GameState.players = data.players;
-            GameUI.updatePlayerList(data.players);
+            GameState.applyRosterSnapshot(data);
+            GameUI.updatePlayerList(GameState.players);
+        });
+
+        socket.on('player_added', (data) => {
+            GameState.applyPlayerAdded(data);
+        });
+
+        socket.on('player_removed', (data) => {
+            GameState.applyPlayerRemoved(data);
         });
         
         socket.on('new_round_started', (data) => {
@@ -120,73 +141,41 @@ const GameMain = {
             
             GameState.myRole = wasContestant ? 'contestant' : 'audience';
             GameUI.updatePlayerList(GameState.players, data.contestants);
-        
-        });
-        
-        socket.on('show_contestant_interface', (data) => {
-            console.log('=== SHOWING CONTESTANT INTERFACE ===');
-            GameState.myRole = 'contestant';
-            
-            GameUI.showView(GameUI.playerView);
-            GameUI.playerQuestionText.textContent = data.question;
-            GameUI.contestantArea.classList.remove('hidden');
-            GameUI.audienceArea.classList.add('hidden');
-            GameUI.votingArea.classList.add('hidden');
-            
-            GameUI.contestantAnswerInput.value = '';
-            GameUI.contestantAnswerInput.disabled = false;
-            
-            const submitBtn = GameUI.contestantArea.querySelector('button');
-            if (submitBtn) {
-                submitBtn.disabled = false;
-                submitBtn.textContent = 'Submit Answer';
+            GameUI.startCountdown(data.deadline, data.server_time, 'Answering');
+
+            if (!GameState.isHost) {
+                GameUI.displayNewRound(data);
             }
-        });
         
-        socket.on('show_audience_interface', (data) => {
-            console.log('=== SHOWING AUDIENCE INTERFACE ===');
-            GameState.myRole = 'audience';
-            
-            GameUI.showView(GameUI.playerView);
-            GameUI.playerQuestionText.textContent = data.question;
-            GameUI.audienceArea.classList.remove('hidden');
-            GameUI.contestantArea.classList.add('hidden');
-            GameUI.votingArea.classList.add('hidden');
-            
-            GameUI.audienceOptionsGrid.innerHTML = '';
-            data.options.forEach((option, index) => {
-                const btn = document.createElement('button');
-                btn.className = 'audience-option-btn';
-                btn.textContent = option;
-                btn.disabled = false;
-                btn.onclick = (e) => {
-                    console.log('Audience selecting option:', index, option);
-                    document.querySelectorAll('.audience-option-btn').forEach(b => b.classList.remove('selected'));
-                    e.target.classList.add('selected');
-                    GameMain.submitAnswer(index);
-                    document.querySelectorAll('.audience-option-btn').forEach(b => b.disabled = true);
-                };
-                GameUI.audienceOptionsGrid.appendChild(btn);
-            });
-        });
-
-        socket.on('timer_update', (data) => { 
-            GameUI.updateTimer(data.time, data.phase); 
         });
         
         socket.on('phase_change', (data) => {
             console.log('=== PHASE CHANGE ===', data.phase);
             if (data.phase === 'voting') {
+                GameUI.startCountdown(data.deadline, data.server_time, 'Voting');
                 if (!GameState.isHost) {
                     console.log('Transitioning to voting, my role:', GameState.myRole);
                     console.log('Answers received:', data.answers);
                     GameUI.transitionToVoting(data.answers);
                 }
             } else if (data.phase === 'results') {
+                GameUI.stopCountdown();
+                GameUI.updateTimer(0, 'Results');
                 GameUI.disableAllInputs();
             }
         });
+
+        socket.on('all_submitted', (data) => {
+            console.log('Everyone has submitted for phase:', data.phase);
+            if (GameUI.endPhaseBtn) {
+                GameUI.endPhaseBtn.classList.add('ready');
+            }
+        });
         
+        socket.on('live_tally', (data) => {
+            GameUI.showLiveTally(data);
+        });
+
         socket.on('answer_received', () => {
             console.log('Answer submitted successfully');
         });
@@ -216,17 +205,20 @@ const GameMain = {
             GameUI.showGameOver(data);
         });
         
-        socket.on('update_my_score', (data) => {
-            console.log('Score updated:', data.score);
-            GameState.myScore = data.score;
+        socket.on('update_scores', (data) => {
+            // Only changed scores are sent; the rank comes from the score -> rank table
+            if (data.changed[GameState.mySid] !== undefined) {
+                GameState.myScore = data.changed[GameState.mySid];
+            }
+            const rank = data.ranks.find(([score]) => score === GameState.myScore);
             if (!GameState.isHost) {
-                GameUI.updateMyScore(data.score);
+                GameUI.updateMyScore(GameState.myScore, rank ? rank[1] : null);
             }
+            GameUI.showLeaderboard(data.top);
         });
         
-        socket.on('new_message', (data) => { 
-            console.log('New message:', data);
-            GameUI.addChatMessage(data); 
+        socket.on('new_messages', (data) => {
+            GameMain.addChatMessages(data.messages);
         });
         
         socket.on('question_selected', (data) => {
@@ -259,19 +251,37 @@ const GameMain = {
             console.log('Socket reconnected, re-announcing...');
             const isHostReferrer = document.referrer.includes(`/host/${GAME_CODE}`);
             const hostToken = localStorage.getItem(`host_token_${GAME_CODE}`);
-            const username = localStorage.getItem(`username_${GAME_CODE}`);
+            const resumeToken = localStorage.getItem(`resume_${GAME_CODE}`);
             
             let announcementPayload = { game_code: GAME_CODE };
             if (isHostReferrer && hostToken) {
                 announcementPayload.host_token = hostToken;
-            } else if (username) {
-                announcementPayload.username = username;
+                announcementPayload.questions_version = localStorage.getItem('questions_version');
+            } else if (resumeToken) {
+                announcementPayload.resume_token = resumeToken;
+                announcementPayload.chat_seq = GameState.chatSeq;
             }
             socket.emit('announce_in_game', announcementPayload);
         });
     },
 
+    addChatMessages(messages) {
+        messages.forEach(msg => {
+            // History replayed on reconnect can overlap what this page already shows
+            if (msg.seq <= GameState.chatSeq) return;
+            GameState.chatSeq = msg.seq;
+            GameUI.addChatMessage(msg);
+        });
+    },
+
     bindDOMEvents() {
+        if (GameUI.endPhaseBtn) {
+            GameUI.endPhaseBtn.addEventListener('click', () => {
+                console.log('Host ending phase early');
+                GameState.socket.emit('end_phase');
+            });
+        }
+
         let lastMessageTime = 0;
         const chatForm = document.getElementById('chat-form');
         const chatInput = document.getElementById('chat-input');
@@ -318,7 +328,8 @@ const GameMain = {
 
     selectQuestion(questionId) {
         console.log('Host selecting question:', questionId);
-        GameState.socket.emit('teacher_selects_question', { question_id: questionId });
+        const heats = parseInt(document.getElementById('heats-input').value, 10) || 1;
+        GameState.socket.emit('teacher_selects_question', { question_id: questionId, heats: heats });
         
     },
 
@@ -6,6 +6,37 @@ const GameState = {
     myColor: '',
     myRole: 'audience',
     myScore: 0,
-    players: {},
-    scores: {},
-};
\ No newline at end of file
+    players: [],
+    rosterSeq: 0,
+    chatSeq: 0,
+    clockOffset: 0,
+    countdown: null,
+
+    applyRosterSnapshot(data) {
+        this.players = data.players;
+        this.rosterSeq = data.seq;
+    },
+
+    applyPlayerAdded(data) {
+        if (!this.acceptRosterSeq(data.seq)) return false;
+        this.players = this.players.filter(p => p.sid !== data.player.sid && p.sid !== data.replaces).concat([data.player]);
+        return true;
+    },
+
+    applyPlayerRemoved(data) {
+        if (!this.acceptRosterSeq(data.seq)) return false;
+        this.players = this.players.filter(p => p.sid !== data.sid);
+        return true;
+    },
+
+    // Deltas must arrive in order; on a gap ask the server for a fresh snapshot
+    acceptRosterSeq(seq) {
+        if (seq <= this.rosterSeq) return false;
+        if (seq > this.rosterSeq + 1) {
+            this.socket.emit('request_player_list');
+            return false;
+        }
+        this.rosterSeq = seq;
+        return true;
+    },
+};
@@ -18,6 +18,8 @@ const GameUI = {
     votingOptionsContainer: document.getElementById('voting-options-container'),
     contestantAnswerInput: document.getElementById('contestant-answer-input'),
     studentChat: document.getElementById('student-chat-container'),
+    endPhaseBtn: document.getElementById('end-phase-btn'),
+    liveTally: document.getElementById('live-tally'),
     
     showView(viewToShow) {
         [this.hostView, this.playerView, this.resultsView, this.waitingView, this.gameOverView].forEach(view => {
@@ -59,12 +61,67 @@ const GameUI = {
         this.phaseDisplay.textContent = phase;
     },
 
-    updateMyScore(score) {
+    startCountdown(deadline, serverTime, phase) {
+        this.stopCountdown();
+        GameState.clockOffset = serverTime - Date.now() / 1000;
+        const tick = () => {
+            const remaining = deadline - (Date.now() / 1000 + GameState.clockOffset);
+            this.updateTimer(Math.max(0, Math.ceil(remaining)), phase);
+            if (remaining <= 0) this.stopCountdown();
+        };
+        tick();
+        GameState.countdown = setInterval(tick, 250);
+
+        if (GameState.isHost && this.endPhaseBtn) {
+            this.endPhaseBtn.classList.remove('hidden', 'ready');
+        }
+    },
+
+    stopCountdown() {
+        if (GameState.countdown) {
+            clearInterval(GameState.countdown);
+            GameState.countdown = null;
+        }
+        if (this.endPhaseBtn) {
+            this.endPhaseBtn.classList.add('hidden');
+        }
+        if (this.liveTally) {
+            this.liveTally.classList.add('hidden');
+        }
+    },
+
+    showLiveTally(tally) {
+        if (!this.liveTally) return;
+        let text;
+        if (tally.phase === 'answering') {
+            const options = tally.answer_counts.map((count, i) => `${String.fromCharCode(65 + i)}:${count}`);
+            text = [`Answers ${tally.answers}/${tally.answers_expected}`, ...options].join(' · ');
+        } else {
+            const votes = tally.vote_counts.map(c => `${c.username} ${c.votes}`);
+            text = [`Votes ${tally.votes}/${tally.votes_expected}`, ...votes].join(' · ');
+        }
+        this.liveTally.textContent = text;
+        this.liveTally.classList.remove('hidden');
+    },
+
+    updateMyScore(score, rank) {
         if (this.myScoreDisplay && !GameState.isHost) {
-            this.myScoreDisplay.textContent = `Your Score: ${score}`;
+            this.myScoreDisplay.textContent = rank ? `Your Score: ${score} (#${rank})` : `Your Score: ${score}`;
         }
     },
 
+    showLeaderboard(top) {
+        const list = document.getElementById('leaderboard-list');
+        if (!list) return;
+        list.innerHTML = '';
+        top.forEach(entry => {
+            const item = document.createElement('li');
+            item.textContent = `${entry.username} — ${entry.score}`;
+            item.style.color = entry.color;
+            list.appendChild(item);
+        });
+    },
+
     setupHostDashboard(questions, usedQuestionIds) {
         console.log('Setting up host dashboard');
         this.showView(this.hostView);
@@ -198,12 +255,14 @@ const GameUI = {
         const resultsContainer = document.getElementById('contestant-results-container');
         resultsContainer.innerHTML = '';
         
+        const multipleHeats = Object.values(data.contestant_answers).some(a => a.heat > 0);
         for (const sid in data.contestant_answers) {
             const answerData = data.contestant_answers[sid];
+            const heatLabel = multipleHeats ? `Heat ${answerData.heat + 1} · ` : '';
             const card = document.createElement('div');
             card.className = 'result-card';
             card.innerHTML = `
-                <h4>${answerData.username} answered:</h4>
+                <h4>${heatLabel}${answerData.username} answered:</h4>
                 <p class="answer-text">"<em>${answerData.answer}</em>"</p>
                 <p class="votes">Received ${answerData.votes} vote${answerData.votes !== 1 ? 's' : ''}.</p>
             `;
@@ -296,6 +355,29 @@ const GameUI = {
             winnerContainer.appendChild(winnerScore);
         }
         
+        if (GameState.isHost) {
+            const hostToken = localStorage.getItem(`host_token_${GAME_CODE}`) || '';
+            const exportLink = document.createElement('a');
+            exportLink.className = 'export-link';
+            exportLink.href = '#';
+            exportLink.textContent = 'Download question results (CSV)';
+            // The host token goes in a header, so it never lands in the URL, history or server logs
+            exportLink.addEventListener('click', (event) => {
+                event.preventDefault();
+                fetch(`/host/${GAME_CODE}/export?format=csv`, { headers: { 'Authorization': `Bearer ${hostToken}` } })
+                    .then((response) => response.ok ? response.blob() : Promise.reject(response.status))
+                    .then((blob) => {
+                        const download = document.createElement('a');
+                        download.href = URL.createObjectURL(blob);
+                        download.download = `game-${GAME_CODE}.csv`;
+                        download.click();
+                        setTimeout(() => URL.revokeObjectURL(download.href), 1000);
+                    })
+                    .catch((status) => console.error('Export failed:', status));
+            });
+            winnerContainer.appendChild(exportLink);
+        }
+        
         const redirectMessage = document.createElement('p');
         redirectMessage.className = 'redirect-message';
         redirectMessage.textContent = 'Redirecting to home in 20 seconds...';
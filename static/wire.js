@@ -0,0 +1,33 @@
+// With SOCKETIO_SERIALIZER=msgpack the server sends players and leaderboard entries as rows instead of objects.
+// attach() expands them in place before any event handler runs; payloads that are already objects pass through.
+const Wire = {
+    PLAYER: ['sid', 'username', 'color', 'position'],
+    LEADER: ['username', 'color', 'score'],
+
+    object(fields, row) {
+        if (!Array.isArray(row)) return row;
+        const obj = {};
+        fields.forEach((field, i) => { obj[field] = row[i]; });
+        return obj;
+    },
+
+    players(rows) {
+        return rows.map(row => this.object(this.PLAYER, row));
+    },
+
+    expand(data) {
+        if (!data || typeof data !== 'object') return;
+        ['players', 'contestants', 'current_contestants'].forEach(key => {
+            if (Array.isArray(data[key])) data[key] = this.players(data[key]);
+        });
+        if (data.player) data.player = this.object(this.PLAYER, data.player);
+        if (Array.isArray(data.heats)) data.heats = data.heats.map(heat => this.players(heat));
+        if (Array.isArray(data.top)) data.top = data.top.map(row => this.object(this.LEADER, row));
+    },
+
+    // Any-listeners are called before the event's own handlers, with the same payload object
+    attach(socket) {
+        socket.onAny((event, data) => this.expand(data));
+        return socket;
+    },
+};
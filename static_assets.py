@@ -0,0 +1,129 @@
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import threading
+from collections import OrderedDict
+
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:  # optional: without it only gzip copies are built
+    brotli = None
+
+log = logging.getLogger(__name__)
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+# Already compressed; gzip would only cost CPU
+INCOMPRESSIBLE = {'.png', '.jpg', '.jpeg', '.gif', '.webp', '.woff', '.woff2', '.mp3', '.ogg', '.mp4'}
+
+
+class Encoded:
+    """One response body with its gzip/brotli copies and an ETag, built once and served many times"""
+
+    __slots__ = ('content_type', 'etag', 'bodies')
+
+    def __init__(self, body, content_type, compress=True):
+        self.content_type = content_type
+        self.etag = hashlib.sha1(body).hexdigest()[:16]
+        self.bodies = {'identity': body}
+        if compress:
+            self._add('gzip', gzip.compress(body, 9, mtime=0), len(body))
+            if brotli:
+                self._add('br', brotli.compress(body, quality=11), len(body))
+
+    def _add(self, encoding, body, size):
+        if len(body) < size * 0.9:
+            self.bodies[encoding] = body
+
+    def response(self, cache_control):
+        """The best copy the request's Accept-Encoding allows, or 304 when the client's copy is current"""
+        headers = {'Cache-Control': cache_control, 'ETag': f'"{self.etag}"', 'Vary': 'Accept-Encoding'}
+        if self.etag in request.if_none_match:
+            return Response(status=304, headers=headers)
+        accepted = request.accept_encodings
+        encoding = max(self.bodies, key=lambda e: (e == 'identity' or accepted[e] > 0, e != 'identity',
+                                                   -len(self.bodies[e])))
+        if encoding != 'identity':
+            headers['Content-Encoding'] = encoding
+        return Response(self.bodies[encoding], content_type=self.content_type, headers=headers)
+
+
+class StaticAssets:
+    """Every file under static/ read once at startup, content-hashed and precompressed.
+
+    `game/game_main.js` is also served as `game/game_main.<hash>.js` with a year-long immutable lifetime;
+    fingerprinted() gives that name so url_for('static', ...) can link to it. The plain name still works
+    and is revalidated by ETag. Set `enabled` False to fall back to Flask's own static view.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.enabled = True
+        self._names = {}   # plain name -> fingerprinted name
+        self._files = {}   # either name -> (Encoded, Cache-Control)
+        original = compressed = 0
+        for root, _, files in os.walk(directory):
+            for filename in files:
+                path = os.path.join(root, filename)
+                name = os.path.relpath(path, directory).replace(os.sep, '/')
+                with open(path, 'rb') as f:
+                    body = f.read()
+                stem, ext = os.path.splitext(name)
+                content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+                if content_type.startswith('text/') or content_type == 'application/javascript':
+                    content_type += '; charset=utf-8'
+                encoded = Encoded(body, content_type, compress=ext.lower() not in INCOMPRESSIBLE)
+                fingerprinted = f'{stem}.{encoded.etag[:10]}{ext}'
+                self._names[name] = fingerprinted
+                self._files[name] = (encoded, REVALIDATE)
+                self._files[fingerprinted] = (encoded, IMMUTABLE)
+                original += len(body)
+                compressed += min(len(b) for b in encoded.bodies.values())
+        log.info("static_assets files=%d bytes=%d smallest_encoded_bytes=%d brotli=%s",
+                 len(self._names), original, compressed, bool(brotli))
+
+    def fingerprinted(self, name):
+        return self._names.get(name, name) if self.enabled else name
+
+    def send(self, filename):
+        entry = self._files.get(filename)
+        if entry is None:
+            return None
+        encoded, cache_control = entry
+        return encoded.response(cache_control)
+
+
+class PageCache:
+    """Rendered pages keyed by template and context, kept with their compressed copies, LRU-evicted.
+
+    For pages whose output depends only on the arguments passed in. They go out with `no-cache` and an
+    ETag, so browsers revalidate and get a 304 while the page is unchanged. Set `enabled` False to
+    render every request.
+    """
+
+    def __init__(self, render, max_pages=512):
+        self.render = render
+        self.max_pages = max_pages
+        self.enabled = True
+        self._pages = OrderedDict()  # (template, context items) -> Encoded
+        self._lock = threading.Lock()
+
+    def get(self, template, **context):
+        if not self.enabled:
+            return self.render(template, **context)
+        key = (template, tuple(sorted(context.items())))
+        with self._lock:
+            page = self._pages.get(key)
+            if page is not None:
+                self._pages.move_to_end(key)
+        if page is None:
+            page = Encoded(self.render(template, **context).encode(), 'text/html; charset=utf-8')
+            with self._lock:
+                self._pages[key] = page
+                while len(self._pages) > self.max_pages:
+                    self._pages.popitem(last=False)
+        return page.response(REVALIDATE)
@@ -0,0 +1,57 @@
+import heapq
+import os
+import threading
+
+
+class ExpiryHeap:
+    """Keys with deadlines, popped in deadline order by one periodic sweep.
+
+    Re-arming a key pushes a fresh entry and leaves the old one to be skipped when it surfaces; the heap
+    is rebuilt once stale entries outnumber live ones, so frequent touches don't grow it without bound.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._deadlines = {}  # key -> current deadline
+        self._lock = threading.Lock()
+
+    def expire_at(self, key, deadline):
+        with self._lock:
+            self._deadlines[key] = deadline
+            heapq.heappush(self._heap, (deadline, key))
+            if len(self._heap) > 2 * len(self._deadlines) + 64:
+                self._heap = [(d, k) for k, d in self._deadlines.items()]
+                heapq.heapify(self._heap)
+
+    def discard(self, key):
+        with self._lock:
+            self._deadlines.pop(key, None)
+
+    def pop_expired(self, now):
+        expired = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                deadline, key = heapq.heappop(self._heap)
+                if self._deadlines.get(key) == deadline:
+                    del self._deadlines[key]
+                    expired.append(key)
+        return expired
+
+    def count(self, kind):
+        with self._lock:
+            return sum(1 for key in self._deadlines if key[0] == kind)
+
+    def __contains__(self, key):
+        return key in self._deadlines
+
+    def __len__(self):
+        return len(self._deadlines)
+
+
+def rss_bytes():
+    """Current resident set size from /proc, or None where that isn't available"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None